@@ -0,0 +1,142 @@
+"""
+Mergeable aggregates of analysis results
+aggregate.py: Implementation of ResultAggregate
+"""
+__author__ = "Reema Sharma"
+
+import math
+from collections import Counter
+from statistics import NormalDist
+from typing import Any, Dict
+
+
+def sentence_weight(result_dict: Dict[str, Any], file_name: str = None) -> int:
+    """
+    Returns the number of sentences a result dictionary's averages are taken over, counting deduplicated copies
+    @param result_dict: Result dictionary with processed text (or a 'sentence_count')
+    @param file_name: OPTIONAL name of file, to fall back to the text of a pipeline made only of Load steps
+    @return: Number of sentences
+    @raise KeyError: If the result dictionary has no processed text
+    """
+    if "sentence_count" in result_dict:
+        return result_dict["sentence_count"]
+    if "sentence_multiplicity" in result_dict:
+        return sum(result_dict["sentence_multiplicity"])
+    if "processed_text" not in result_dict and file_name in result_dict:
+        return len(result_dict[file_name]["processed_text"])
+    return len(result_dict["processed_text"])
+
+
+class ResultAggregate:
+    """
+    Class implementation of a mergeable summary of Analyze results <br><br>
+    Keeps sums rather than averages so that results over parts of a file (or over files of a corpus) can be added and
+    subtracted: word counts and word frequencies are summed, and polarity and subjectivity are summed weighted by the
+    number of sentences they were averaged over. <br><br>
+    """
+
+    def __init__(self):
+        self.sentences = 0
+        self.word_count = None
+        self.polarity_sum = None
+        self.subjectivity_sum = None
+        self.word_frequency = None
+
+    def add(self, result_dict: Dict[str, Any], sign: int = 1, file_name: str = None):
+        """
+        Merges the Analyze results of a result dictionary (or a whole file's results) into the aggregate <br><br>
+        Only the keys produced by the pipeline's Analyze steps are merged. <br><br>
+        @param result_dict: Result dictionary with processed text (or a 'sentence_count') and Analyze results
+        @param sign: 1 to add the results, -1 to remove results that were added before (default: 1)
+        @param file_name: OPTIONAL name of file, see sentence_weight
+        @return: self
+        """
+        weight = sentence_weight(result_dict, file_name)
+        self.sentences += sign * weight
+
+        if "word_count" in result_dict:
+            self.word_count = (self.word_count or 0) + sign * result_dict["word_count"]
+        if "avg_polarity" in result_dict:
+            self.polarity_sum = (self.polarity_sum or 0.0) + sign * result_dict["avg_polarity"] * weight
+        if "avg_subjectivity" in result_dict:
+            self.subjectivity_sum = (self.subjectivity_sum or 0.0) + sign * result_dict["avg_subjectivity"] * weight
+        if "word_frequency" in result_dict:
+            if self.word_frequency is None:
+                self.word_frequency = Counter()
+            if sign > 0:
+                self.word_frequency.update(result_dict["word_frequency"])
+            else:
+                # Counter.subtract keeps zero counts, which would leave removed words in the frequencies
+                self.word_frequency.subtract(result_dict["word_frequency"])
+                self.word_frequency = +self.word_frequency
+        return self
+
+    def remove(self, result_dict: Dict[str, Any]):
+        """
+        Removes results previously merged with add
+        @param result_dict: Result dictionary that was added
+        @return: self
+        """
+        return self.add(result_dict, sign=-1)
+
+    def merge(self, other: "ResultAggregate"):
+        """
+        Merges another aggregate into this one
+        @param other: Aggregate to merge
+        @return: self
+        """
+        self.sentences += other.sentences
+        for name in ("word_count", "polarity_sum", "subjectivity_sum"):
+            value = getattr(other, name)
+            if value is not None:
+                setattr(self, name, (getattr(self, name) or 0) + value)
+        if other.word_frequency is not None:
+            if self.word_frequency is None:
+                self.word_frequency = Counter()
+            self.word_frequency.update(other.word_frequency)
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns the aggregate in the form of a result dictionary
+        @return: Dictionary with 'sentence_count' and the merged Analyze results
+        """
+        result = {"sentence_count": self.sentences}
+        if self.word_count is not None:
+            result["word_count"] = self.word_count
+        if self.polarity_sum is not None:
+            result["avg_polarity"] = self.polarity_sum / self.sentences if self.sentences else 0.0
+        if self.subjectivity_sum is not None:
+            result["avg_subjectivity"] = self.subjectivity_sum / self.sentences if self.sentences else 0.0
+        if self.word_frequency is not None:
+            result["word_frequency"] = Counter(self.word_frequency)
+        return result
+
+
+def combine_estimates(results: Dict[str, Dict[str, Any]], key: str, confidence: float = 0.95) -> Dict[str, Any]:
+    """
+    Combines per-file results into a corpus-level estimate with a confidence interval <br><br>
+    Each file is a stratum: averages are weighted by the files' sentence counts and word counts are summed. Files
+    analyzed in approximate mode contribute the standard error stored under key + '_se'; exact results contribute
+    none. <br><br>
+    @param results: Dictionary mapping file names to their result dictionaries
+    @param key: 'word_count', 'avg_polarity' or 'avg_subjectivity'
+    @param confidence: Confidence level of the interval (default: 0.95)
+    @return: Dictionary with the 'estimate', its 'ci' as a (low, high) tuple and its standard error 'se'
+    """
+    total, variance, sentences = 0.0, 0.0, 0
+    for result_dict in results.values():
+        weight = 1 if key == "word_count" else sentence_weight(result_dict)
+        total += weight * result_dict[key]
+        variance += (weight * result_dict.get(f"{key}_se", 0.0)) ** 2
+        sentences += sentence_weight(result_dict)
+
+    if key == "word_count":
+        estimate, standard_error = total, math.sqrt(variance)
+    else:
+        estimate = total / sentences if sentences else 0.0
+        standard_error = math.sqrt(variance) / sentences if sentences else 0.0
+
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    return {"estimate": estimate, "ci": (estimate - z * standard_error, estimate + z * standard_error),
+            "se": standard_error}
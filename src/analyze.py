@@ -4,15 +4,54 @@ analyze.py: Implements the analyzer class
 """
 __author__ = "Reema Sharma"
 
+import bisect
+import itertools
+import math
+import random
 from collections import Counter
-from textblob import TextBlob
+from statistics import NormalDist
 from typing import Dict, Any
 from src.exceptions.analyze_exceptions import UnsupportedAnalyzeTypeError
+from src.memo import SentimentMemo
+from src.metrics import CACHE_HITS, CACHE_MISSES, SENTENCES
+
+
+def _sample_positions(population: int, limit: int, seed):
+    """
+    Lazily draws positions from range(population) without replacement, in random order <br><br>
+    Runs a Fisher-Yates shuffle one step per draw, remembering only the swapped positions, so stopping after n draws
+    costs O(n) time and memory whatever the population.
+    @param population: Number of positions
+    @param limit: Maximum number of positions to draw
+    @param seed: Seed of the random number generator
+    @return: Iterator of positions
+    """
+    rng = random.Random(seed)
+    swapped = {}
+    for i in range(limit):
+        j = rng.randrange(i, population)
+        yield swapped.get(j, j)
+        swapped[j] = swapped.pop(i, i)
 
 
 class Analyze:
     def __init__(self, analyze_type: str, **kwargs: Dict[str, Any]):
+        """
+        Constructor to take in the analysis type <br><br>
+        @param analyze_type: Type of analysis to run
+        @param kwargs: OPTIONAL 'memo', a SentimentMemo shared by sentiment steps (and across runs if it has a path)
+        and the approximate mode options of word_count, polarity_score and subjectivity_score: 'sample_size' (maximum
+        number of sentences sampled per file), 'target_error' (stop sampling once the confidence interval half-width is
+        this small), 'confidence' (default: 0.95), 'min_sample' (default: 30) and 'seed' (default: 0)
+        """
         self.analyze_type = analyze_type
+        self.memo = kwargs.get("memo")
+        self.sample_size = kwargs.get("sample_size")
+        self.target_error = kwargs.get("target_error")
+        self.confidence = kwargs.get("confidence", 0.95)
+        self.min_sample = kwargs.get("min_sample", 30)
+        self.seed = kwargs.get("seed", 0)
+        self.approximate = self.sample_size is not None or self.target_error is not None
         self.map = {
             'word_count': self._word_count,
             'polarity_score': self._polarity_score,
@@ -27,6 +66,9 @@ class Analyze:
         @param file_name: Name of file
         @return: Updated result_dict with new results
         """
+        if self.memo is not None:
+            hits, misses = self.memo.hits, self.memo.misses
+
         try:
             self.map[self.analyze_type](result_dict)
         except KeyError:
@@ -34,15 +76,108 @@ class Analyze:
         except Exception as e:
             raise e
 
+        SENTENCES.inc(len(result_dict["processed_text"]), stage='analyze', type=self.analyze_type)
+        if self.memo is not None:
+            self.memo.flush()
+            CACHE_HITS.inc(self.memo.hits - hits, cache='sentiment')
+            CACHE_MISSES.inc(self.memo.misses - misses, cache='sentiment')
+
         return result_dict
 
+    @staticmethod
+    def _weighted_text(result_dict):
+        """
+        Pairs each processed sentence with the number of copies it stands for (set by the 'dedup' process step)
+        @param result_dict: Result dictionary to read the processed text from
+        @return: List of (sentence, multiplicity) tuples
+        """
+        processed_text = result_dict["processed_text"]
+        multiplicity = result_dict.get("sentence_multiplicity", [1] * len(processed_text))
+        return list(zip(processed_text, multiplicity))
+
+    def _sentiment_average(self, result_dict, index, key):
+        """
+        Averages one component of the TextBlob sentiment over the processed text, scoring each distinct sentence once
+        @param result_dict: Result dictionary to read the processed text from
+        @param index: 0 for polarity, 1 for subjectivity
+        @param key: Result key of the average, used to store the confidence interval in approximate mode
+        @return: Average score weighted by sentence multiplicity
+        """
+        memo = self.memo if self.memo is not None else SentimentMemo()
+
+        if self.approximate:
+            return self._estimate(result_dict, key, lambda sentence: memo.score(sentence)[index])
+
+        weighted_text = self._weighted_text(result_dict)
+        total = sum(memo.score(sentence)[index] * count for sentence, count in weighted_text)
+        return total / sum(count for _, count in weighted_text)
+
+    def _estimate(self, result_dict, key, value_of, scale=False):
+        """
+        Estimates the average of a per-sentence value from a random sample of the file's sentences <br><br>
+        Sentences are drawn without replacement (duplicates counted by multiplicity) until sample_size sentences have
+        been drawn or, with a target_error, until the confidence interval's half-width (in the units of the result)
+        is at most target_error. The interval uses the normal approximation with a finite population correction, so
+        sampling the whole file gives the exact value.
+        The interval, standard error and sample size are stored under key + '_ci', '_se' and '_sample_size'.
+        @param result_dict: Result dictionary to read the processed text from
+        @param key: Result key of the estimate
+        @param value_of: Function computing the value of one sentence
+        @param scale: Estimate the total over all sentences instead of the average (default: False)
+        @return: Point estimate
+        """
+        processed_text = result_dict["processed_text"]
+        if "sentence_multiplicity" in result_dict:
+            # Position p of the expanded text is a copy of the first sentence whose cumulative count exceeds p
+            cumulative = list(itertools.accumulate(result_dict["sentence_multiplicity"]))
+            population = cumulative[-1] if cumulative else 0
+            def sentence_at(position):
+                return processed_text[bisect.bisect_right(cumulative, position)]
+        else:
+            population = len(processed_text)
+            sentence_at = processed_text.__getitem__
+        limit = population if self.sample_size is None else min(self.sample_size, population)
+        z = NormalDist().inv_cdf((1 + self.confidence) / 2)
+        factor = population if scale else 1
+
+        if population == 0:
+            # Nothing to sample: an empty file has no words and no sentiment, with no uncertainty
+            result_dict[f"{key}_ci"] = (0.0, 0.0)
+            result_dict[f"{key}_se"] = 0.0
+            result_dict[f"{key}_sample_size"] = 0
+            return 0.0
+
+        n, mean, squares, standard_error = 0, 0.0, 0.0, math.inf
+        for position in _sample_positions(population, limit, self.seed):
+            value = value_of(sentence_at(position))
+            # Welford's online update of the mean and the sum of squared deviations
+            n += 1
+            delta = value - mean
+            mean += delta / n
+            squares += delta * (value - mean)
+
+            if n == population:
+                standard_error = 0.0
+            elif n >= 2:
+                standard_error = math.sqrt(squares / (n - 1) / n * (population - n) / (population - 1))
+            if (self.target_error is not None and n >= self.min_sample
+                    and z * standard_error * factor <= self.target_error):
+                break
+
+        result_dict[f"{key}_ci"] = ((mean - z * standard_error) * factor, (mean + z * standard_error) * factor)
+        result_dict[f"{key}_se"] = standard_error * factor
+        result_dict[f"{key}_sample_size"] = n
+        return mean * factor
+
     def _word_count(self, result_dict, **kwargs: Dict[str, Any]):
         """
         Calculate word count in the processed text
         @param result_dict: Result dictionary to update with process results
         """
-        processed_text = result_dict["processed_text"]
-        word_count = sum(len(sentence.split()) for sentence in processed_text)
+        if self.approximate:
+            word_count = self._estimate(result_dict, "word_count", lambda sentence: len(sentence.split()), scale=True)
+        else:
+            word_count = sum(len(sentence.split()) * count for sentence, count in self._weighted_text(result_dict))
         result_dict["word_count"] = word_count
         return result_dict
 
@@ -51,15 +186,8 @@ class Analyze:
         Calculate average sentiment score of the processed text using TextBlob
         @param result_dict: Result dictionary to update with process results
         """
-        processed_text = result_dict["processed_text"]
-        sentiment_polarities = []
-
-        for sentence in processed_text:
-            blob = TextBlob(sentence)
-            sentiment_polarities.append(blob.sentiment.polarity)
-
         # Calculate overall sentiment score
-        avg_polarity_score = sum(sentiment_polarities) / len(sentiment_polarities)
+        avg_polarity_score = self._sentiment_average(result_dict, 0, "avg_polarity")
         result_dict["avg_polarity"] = avg_polarity_score
         return result_dict
 
@@ -68,15 +196,8 @@ class Analyze:
         Calculate average sentiment subjectivity score of the processed text using TextBlob
         @param result_dict: Result dictionary to update with process results
         """
-        processed_text = result_dict["processed_text"]
-        subjectivities = []
-
-        for sentence in processed_text:
-            blob = TextBlob(sentence)
-            subjectivities.append(blob.sentiment.subjectivity)
-
         # Calculate overall sentiment subjectivity score
-        avg_sentiment_subjectivity = sum(subjectivities) / len(subjectivities)
+        avg_sentiment_subjectivity = self._sentiment_average(result_dict, 1, "avg_subjectivity")
         result_dict["avg_subjectivity"] = avg_sentiment_subjectivity
         return result_dict
 
@@ -85,8 +206,14 @@ class Analyze:
         Calculate word frequency in the processed text
         @param result_dict: Result dictionary to update with process results
         """
-        processed_text = result_dict["processed_text"]
-        all_words = ' '.join(processed_text).split()
-        word_freq = Counter(all_words)
+        weighted_text = self._weighted_text(result_dict)
+
+        if all(count == 1 for _, count in weighted_text):
+            word_freq = Counter(' '.join(sentence for sentence, _ in weighted_text).split())
+        else:
+            word_freq = Counter()
+            for sentence, count in weighted_text:
+                for word, occurrences in Counter(sentence.split()).items():
+                    word_freq[word] += occurrences * count
         result_dict["word_frequency"] = word_freq
         return result_dict
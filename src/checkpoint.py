@@ -0,0 +1,111 @@
+"""
+Class to checkpoint the results of long NLPAnalyzer runs
+checkpoint.py: Implementation of Checkpoint
+"""
+__author__ = "Srihari Raman"
+
+# Imports
+import os
+import pickle
+import struct
+import zlib
+from typing import Any, Dict
+
+# Every record is framed as <payload length><crc32 of payload><pickled (file_name, result_dict)>
+# A result_dict of None marks a file removed after it was recorded
+_HEADER = struct.Struct('<II')
+
+
+class Checkpoint:
+    """
+    Class implementation of an append-only checkpoint log <br><br>
+    Completed per-file results are appended to a log file in batches of `interval` files. Each batch is written with a
+    single write followed by an fsync and every record carries a checksum, so a run killed mid-write only loses the
+    torn record at the end of the log, which is discarded the next time the log is loaded. <br><br>
+    """
+
+    def __init__(self, path: str, interval: int = 1):
+        """
+        Constructor to take in the log path <br><br>
+        @param path: Path of the checkpoint log (created on the first flush)
+        @param interval: Number of completed files buffered between writes (default: 1, i.e. after every file)
+        """
+        self.path = path
+        self.interval = max(1, interval)
+        self._buffer = []
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Reads the results recorded by earlier runs, truncating any torn record at the end of the log <br><br>
+        @return: Dictionary mapping file names to their result dictionaries
+        """
+        results = {}
+        if not os.path.exists(self.path):
+            return results
+
+        with open(self.path, 'rb') as file:
+            data = file.read()
+
+        offset = 0
+        while offset + _HEADER.size <= len(data):
+            length, checksum = _HEADER.unpack_from(data, offset)
+            payload = data[offset + _HEADER.size:offset + _HEADER.size + length]
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                break
+            file_name, result_dict = pickle.loads(payload)
+            if result_dict is None:
+                results.pop(file_name, None)
+            else:
+                results[file_name] = result_dict
+            offset += _HEADER.size + length
+
+        # Drop the torn tail so that new records are appended right after the last complete one
+        if offset < len(data):
+            with open(self.path, 'r+b') as file:
+                file.truncate(offset)
+
+        return results
+
+    def add(self, file_name: str, result_dict: Dict[str, Any]):
+        """
+        Records the result of a completed file, writing the buffer out once `interval` files have completed <br><br>
+        @param file_name: Name of file
+        @param result_dict: Result dictionary of the file
+        @return: None
+        """
+        payload = pickle.dumps((file_name, result_dict), protocol=pickle.HIGHEST_PROTOCOL)
+        self._buffer.append(_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+
+        if len(self._buffer) >= self.interval:
+            self.flush()
+
+    def remove(self, file_name: str):
+        """
+        Records that a file was removed, so that loading the log no longer returns its earlier result <br><br>
+        @param file_name: Name of file
+        @return: None
+        """
+        self.add(file_name, None)
+
+    def flush(self):
+        """
+        Appends the buffered records to the log and syncs it to disk
+        @return: None
+        """
+        if not self._buffer:
+            return
+
+        with open(self.path, 'ab') as file:
+            file.write(b''.join(self._buffer))
+            file.flush()
+            os.fsync(file.fileno())
+        self._buffer = []
+
+    def clear(self):
+        """
+        Deletes the log, e.g. once a run has completed and its results have been saved elsewhere
+        @return: None
+        """
+        self._buffer = []
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,290 @@
+"""
+Sharded execution of a pipeline across worker processes or hosts
+cluster.py: Implementation of ShardWorker, LocalWorkers and Coordinator
+"""
+__author__ = "Srihari Raman"
+
+# Imports
+import argparse
+import multiprocessing
+import pickle
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from src.aggregate import ResultAggregate
+from src.exceptions.cluster_exceptions import ShardFailedError
+
+# Every message is framed as <payload length><pickled message>
+_HEADER = struct.Struct('<Q')
+
+
+def send_message(sock: socket.socket, message):
+    """
+    Sends a message over a socket
+    @param sock: Connected socket
+    @param message: Picklable message
+    @return: None
+    """
+    payload = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytearray:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            raise ConnectionError("Connection closed in the middle of a message")
+        received += count
+    return buffer
+
+
+def recv_message(sock: socket.socket):
+    """
+    Receives a message sent with send_message
+    @param sock: Connected socket
+    @return: The message
+    @raise ConnectionError: If the connection closes before the whole message arrived
+    """
+    (length,) = _HEADER.unpack(_recv_exactly(sock, _HEADER.size))
+    return pickle.loads(_recv_exactly(sock, length))
+
+
+def shard_of(file_name: str, shards: int) -> int:
+    """
+    Assigns a file to a shard by a hash of its name that is stable across processes and runs
+    @param file_name: Name of file
+    @param shards: Number of shards
+    @return: Shard number in range(shards)
+    """
+    return zlib.crc32(file_name.encode('utf-8')) % shards
+
+
+class _ShardHandler(socketserver.BaseRequestHandler):
+    """
+    Handles one shard: receives (pipeline, files) and streams back one message per file, then a 'done' message
+    """
+
+    def handle(self):
+        pipeline, files = recv_message(self.request)
+        for file_name, file_path, kwargs in files:
+            try:
+                result_dict = pipeline.execute(file_name, file_path, kwargs=kwargs)
+            except Exception as e:
+                send_message(self.request, ("error", file_name, f"{type(e).__name__}: {e}"))
+                return
+            send_message(self.request, ("result", file_name, result_dict))
+        send_message(self.request, ("done", None, None))
+
+
+class _ShardServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class ShardWorker:
+    """
+    Class implementation of a shard worker <br><br>
+    Listens on a TCP port and runs the pipeline sent along with every shard on the shard's files, streaming each
+    file's result back as soon as it is done. Messages are pickled, so workers must only listen on trusted networks.
+    On another host, start one with `python -m src.cluster --host 0.0.0.0 --port 9000` from a checkout of the same
+    code. <br><br>
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        """
+        Constructor to take in where to listen <br><br>
+        @param host: Host to listen on (default: 127.0.0.1)
+        @param port: TCP port to listen on, 0 for any free port (default: 0)
+        """
+        self.server = _ShardServer((host, port), _ShardHandler)
+
+    @property
+    def server_address(self) -> Tuple[str, int]:
+        """
+        The (host, port) tuple the worker listens on
+        """
+        return self.server.server_address
+
+    def serve_forever(self):
+        """
+        Serves shards until shutdown is called from another thread
+        @return: None
+        """
+        self.server.serve_forever()
+
+    def shutdown(self):
+        """
+        Stops serving and releases the socket
+        @return: None
+        """
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _serve_local(connection):
+    """
+    Entry point of a local worker process: reports the worker's address to the parent and serves shards
+    """
+    worker = ShardWorker()
+    connection.send(worker.server_address)
+    connection.close()
+    worker.serve_forever()
+
+
+class LocalWorkers:
+    """
+    Class implementation of a group of ShardWorkers running in local processes <br><br>
+    Each worker listens on its own port of 127.0.0.1, standing in for a worker host. <br><br>
+    """
+
+    def __init__(self, count: int):
+        """
+        Constructor to start the workers <br><br>
+        @param count: Number of worker processes
+        """
+        self.processes = []
+        self.addresses = []
+        for _ in range(count):
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_serve_local, args=(child,), daemon=True)
+            process.start()
+            child.close()
+            self.addresses.append(parent.recv())
+            parent.close()
+            self.processes.append(process)
+
+    def close(self):
+        """
+        Stops the worker processes
+        @return: None
+        """
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class Coordinator:
+    """
+    Class implementation of a shard coordinator <br><br>
+    Splits the files into one shard per worker by a hash of their names, sends every shard to its worker over TCP
+    together with the pipeline, and streams the results back in file order. A shard that fails (the worker cannot be
+    reached, drops the connection or fails on a file) is retried on the next worker, resending only the files whose
+    results have not arrived yet. The per-shard aggregates are merged into a corpus-level ResultAggregate. <br><br>
+    """
+
+    def __init__(self, pipeline, addresses: List[Tuple[str, int]], retries: int = 2, timeout: float = None):
+        """
+        Constructor to take in the pipeline and the workers <br><br>
+        @param pipeline: Pipeline every worker runs
+        @param addresses: (host, port) of every ShardWorker
+        @param retries: Number of times a failed shard is retried on another worker (default: 2)
+        @param timeout: OPTIONAL seconds to wait on a worker before the attempt counts as failed
+        """
+        if not addresses:
+            raise ValueError("Coordinator needs at least one worker address")
+        self.pipeline = pipeline
+        self.addresses = list(addresses)
+        self.retries = retries
+        self.timeout = timeout
+        self.corpus = ResultAggregate()
+
+    def run(self, files: Iterable[Tuple[str, str, Dict[str, Any]]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Runs the pipeline on the files across the workers <br><br>
+        @param files: Iterable of (file_name, file_path, kwargs) like the ones NLPAnalyzer passes to Pipeline.execute
+        @return: Iterator of (file_name, result_dict) in file order
+        @raise ShardFailedError: If a shard still fails after all of its retries
+        """
+        # A repeated file name keeps the last entry, as it would overwrite the earlier result anyway
+        files = list({file_name: (file_name, file_path, kwargs) for file_name, file_path, kwargs in files}.values())
+        shards = [[] for _ in self.addresses]
+        for entry in files:
+            shards[shard_of(entry[0], len(shards))].append(entry)
+
+        arrivals = queue.Queue()
+        stop = threading.Event()
+        threads = [threading.Thread(target=self._run_shard, args=(shard, entries, arrivals, stop),
+                                    name=f"linguisight-shard-{shard}", daemon=True)
+                   for shard, entries in enumerate(shards) if entries]
+        for thread in threads:
+            thread.start()
+
+        aggregates = [ResultAggregate() for _ in shards]
+        results = {}
+        position = 0
+        try:
+            while position < len(files):
+                shard, file_name, value = arrivals.get()
+                if file_name is None:
+                    raise ShardFailedError(shard, value)
+                results[file_name] = value
+                aggregates[shard].add(value)
+
+                # Yield every result that is next in file order
+                while position < len(files) and files[position][0] in results:
+                    file_name = files[position][0]
+                    yield file_name, results.pop(file_name)
+                    position += 1
+        finally:
+            # Also stops the shards when the caller abandons the iterator early
+            stop.set()
+
+        for thread in threads:
+            thread.join()
+        self.corpus = ResultAggregate()
+        for aggregate in aggregates:
+            self.corpus.merge(aggregate)
+
+    def _run_shard(self, shard: int, entries: list, arrivals: queue.Queue, stop: threading.Event):
+        """
+        Sends a shard to its worker, retrying on the next workers, and puts every result on the arrivals queue
+        @param shard: Shard number
+        @param entries: (file_name, file_path, kwargs) of the shard's files
+        @param arrivals: Queue receiving (shard, file_name, result_dict), or (shard, None, reason) on failure
+        @param stop: Event set once the results are no longer wanted
+        @return: None
+        """
+        received = set()
+        reason = None
+        for attempt in range(self.retries + 1):
+            pending = [entry for entry in entries if entry[0] not in received]
+            address = self.addresses[(shard + attempt) % len(self.addresses)]
+            try:
+                with socket.create_connection(address, timeout=self.timeout) as sock:
+                    send_message(sock, (self.pipeline, pending))
+                    while not stop.is_set():
+                        kind, file_name, value = recv_message(sock)
+                        if kind == "done":
+                            return
+                        if kind == "error":
+                            raise RuntimeError(f"{file_name}: {value}")
+                        received.add(file_name)
+                        arrivals.put((shard, file_name, value))
+                    return
+            except (OSError, EOFError, RuntimeError, pickle.UnpicklingError) as e:
+                reason = f"{address[0]}:{address[1]}: {e}"
+
+        arrivals.put((shard, None, reason))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a Linguisight shard worker")
+    parser.add_argument("--host", default="127.0.0.1", help="Host to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=9000, help="TCP port to listen on (default: 9000)")
+    args = parser.parse_args()
+    ShardWorker(args.host, args.port).serve_forever()
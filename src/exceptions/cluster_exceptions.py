@@ -0,0 +1,17 @@
+"""
+Predefined exceptions for the cluster module
+cluster_exceptions.py: Predefined exceptions for the cluster module
+"""
+__author__ = "Srihari Raman"
+
+
+class ShardFailedError(Exception):
+    """
+    Exception to be raised when a shard still fails after all of its retries
+    """
+    def __init__(self, shard, reason, message="Shard {} failed: {}"):
+        self.message = message.format(shard, reason)
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
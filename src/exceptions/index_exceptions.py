@@ -0,0 +1,17 @@
+"""
+Predefined exceptions for the index module
+index_exceptions.py: Predefined exceptions for the index module
+"""
+__author__ = "Srihari Raman"
+
+
+class IndexFormatError(Exception):
+    """
+    Exception to be raised when a saved index cannot be read
+    """
+    def __init__(self, directory, reason, message="Cannot load index from {}: {}"):
+        self.message = message.format(directory, reason)
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
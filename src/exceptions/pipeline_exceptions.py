@@ -0,0 +1,17 @@
+"""
+Predefined exceptions for the pipeline module
+pipeline_exceptions.py: Predefined exceptions for the pipeline module
+"""
+__author__ = "Srihari Raman"
+
+
+class InvalidPipelineError(Exception):
+    """
+    Exception to be raised when the steps of a pipeline cannot be run
+    """
+    def __init__(self, reason, message="Invalid pipeline: {}"):
+        self.message = message.format(reason)
+        super().__init__(self.message)
+
+    def __str__(self):
+        return self.message
@@ -4,7 +4,14 @@ framework.py: Class implementation; Framework built for an NLP pipeline
 __author__ = "Srihari Raman, Reema Sharma, Sriya Vuppala"
 
 # Imports
-from pipeline import Pipeline
+from src.pipeline import Pipeline
+from src.index import InvertedIndex, document_terms
+from src.source import FileSource
+from src.shared import SharedResult, discard_shared, execute_shared, init_worker
+from src.aggregate import ResultAggregate, combine_estimates, sentence_weight
+from src.metrics import FILES, SENTENCES
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
 from wordcloud import WordCloud
 import plotly.express as px
 import matplotlib.pyplot as plt
@@ -19,23 +26,256 @@ class NLPAnalyzer:
     This class is used to build the overarching NLP framework <br><br>
     """
 
-    def __init__(self, files, parser, **kwargs):
+    def __init__(self, files, parser, checkpoint=None, **kwargs):
         """
         Constructor to take in multiple files as tuples -> [(file_name, file_path), ...]
-        @param files: Tuples of files to be analyzed
+        @param files: Tuples of files to be analyzed, or a FileSource over a directory or glob
         @param parser: Parser object to be used for parsing the files
+        @param checkpoint: OPTIONAL Checkpoint to record completed files to and resume from
         """
         self.files = files
         self.parser = parser
+        self.checkpoint = checkpoint
         self.results = {}
         self.kwargs = kwargs
+        self.index = None
+        # Corpus-wide statistics, kept up to date as files are added and removed
+        self.corpus = ResultAggregate()
+        self.vocabulary = Counter()
 
-    def analyze(self):
+    def analyze(self, workers=None, scheduler=None, coordinator=None, progress=None):
         """
         Runs the framework to analyze the files using the parser
+        With a checkpoint, files completed by an earlier run are loaded from it instead of being analyzed again
+        @param workers: OPTIONAL number of worker processes; their results are passed back through shared memory
+        @param scheduler: OPTIONAL StageScheduler streaming the files through the parser under a memory budget
+        @param coordinator: OPTIONAL Coordinator sharding the files across ShardWorkers over TCP
+        @param progress: OPTIONAL ProgressReporter reporting files done, throughput and ETA during the run
+        Completed files and their sentences are counted in the metrics registry (see metrics.py) however they run, but
+        per-step latencies of worker and coordinator runs are recorded by the worker processes
         """
+        if sum((bool(workers), scheduler is not None, coordinator is not None)) > 1:
+            raise ValueError("analyze takes only one of workers, a scheduler or a coordinator")
+
+        done = set()
+        if self.checkpoint is not None:
+            self.results.update(self.checkpoint.load())
+            done = set(self.results)
+
+        pending = self._pending_files(done)
+        if workers:
+            completed = self._execute_parallel(pending, workers)
+        elif scheduler is not None:
+            completed = scheduler.run(pending)
+        elif coordinator is not None:
+            completed = coordinator.run(pending)
+        else:
+            completed = ((file_name, self.parser.execute(file_name, file_path, kwargs=kwargs))
+                         for file_name, file_path, kwargs in pending)
+
+        # Files about to be analyzed again are replaced, so their earlier results must not be merged twice
+        for file_name, _ in self.files:
+            if file_name not in done:
+                self.results.pop(file_name, None)
+
+        self.corpus = ResultAggregate()
+        self.vocabulary = Counter()
+        for file_name, result_dict in self.results.items():
+            self._merge_file(file_name, result_dict)
+
+        if progress is not None:
+            progress.start(sum(1 for file_name, _ in self.files if file_name not in done))
+        self._record(completed, progress)
+        if progress is not None:
+            progress.finish()
+
+    def add_files(self, files, workers=None):
+        """
+        Analyzes only the given files and merges them into the results, corpus statistics and vocabulary
+        A file whose name was already analyzed is replaced by the new one
+        A built inverted index is rebuilt in full from the stored results (see _refresh_index)
+        @param files: Tuples of files to be added -> [(file_name, file_path), ...]
+        @param workers: OPTIONAL number of worker processes, as in analyze
+        @return: None
+        """
+        files = list(files)
+        replaced = [file_name for file_name, _ in files if file_name in self.results]
+        if replaced:
+            self.remove_files(replaced)
+
+        pending = ((file_name, file_path, self.kwargs) for file_name, file_path in files)
+        if workers:
+            completed = self._execute_parallel(pending, workers)
+        else:
+            completed = ((file_name, self.parser.execute(file_name, file_path, kwargs=kwargs))
+                         for file_name, file_path, kwargs in pending)
+
+        self._set_files(list(self.files) + files)
+        self._record(completed)
+        self._refresh_index()
+
+    def remove_files(self, file_names):
+        """
+        Removes analyzed files from the results, corpus statistics and vocabulary without analyzing anything again
+        A built inverted index is rebuilt in full from the stored results (see _refresh_index)
+        @param file_names: Names of the files to be removed
+        @return: None
+        @raise KeyError: If a file has not been analyzed
+        """
+        file_names = set(file_names)
+        missing = file_names - set(self.results)
+        if missing:
+            raise KeyError(f"Files not analyzed: {', '.join(sorted(missing))}")
+
+        for file_name in file_names:
+            self._merge_file(file_name, self.results.pop(file_name), sign=-1)
+            if self.checkpoint is not None:
+                self.checkpoint.remove(file_name)
+        if self.checkpoint is not None:
+            self.checkpoint.flush()
+
+        self._set_files([(file_name, file_path) for file_name, file_path in self.files
+                         if file_name not in file_names])
+        self._refresh_index()
+
+    def _record(self, completed, progress=None):
+        """
+        Stores completed results, merging them into the corpus statistics and recording them to the checkpoint
+        @param completed: Iterator of (file_name, result_dict)
+        @param progress: OPTIONAL ProgressReporter to update with every completed file
+        @return: None
+        """
+        try:
+            for file_name, result_dict in completed:
+                self.results[file_name] = result_dict
+                self._merge_file(file_name, result_dict)
+                FILES.inc()
+                try:
+                    SENTENCES.inc(sentence_weight(result_dict, file_name), stage='corpus')
+                except KeyError:
+                    pass
+                if self.checkpoint is not None:
+                    self.checkpoint.add(file_name, result_dict)
+                if progress is not None:
+                    progress.update(file_name, result_dict)
+        finally:
+            # Record whatever completed, even if a file failed
+            if self.checkpoint is not None:
+                self.checkpoint.flush()
+
+    def _merge_file(self, file_name, result_dict, sign=1):
+        """
+        Adds a file's results to (or with sign=-1, removes them from) the corpus statistics and vocabulary
+        @param file_name: Name of file
+        @param result_dict: Result dictionary of the file
+        @param sign: 1 to add the file, -1 to remove it (default: 1)
+        @return: None
+        """
+        try:
+            self.corpus.add(result_dict, sign=sign, file_name=file_name)
+        except KeyError:
+            # Results without any text (and no 'sentence_count') have nothing to merge into the corpus statistics
+            pass
+        terms = document_terms(result_dict, file_name)
+        if terms is None:
+            # Results without text or word frequencies (e.g. from a StageScheduler) have no terms to count
+            return
+        terms = Counter(terms)
+        if sign > 0:
+            self.vocabulary.update(terms)
+        else:
+            self.vocabulary.subtract(terms)
+            self.vocabulary = +self.vocabulary
+
+    def _set_files(self, files):
+        """
+        Replaces the list of files, keeping a FileSource so that later runs still prefetch
+        @param files: Tuples of files -> [(file_name, file_path), ...]
+        @return: None
+        """
+        if isinstance(self.files, FileSource):
+            self.files.files = files
+        else:
+            self.files = files
+
+    def _refresh_index(self):
+        """
+        Rebuilds the inverted index from the stored results if one was built, so that it covers the current files
+        This is a full rebuild over the whole corpus: the index's arrays are compact and sorted, so postings are not
+        merged or deleted in place. Rebuilding does not run the parser again, but it costs time proportional to the
+        corpus on every add_files and remove_files; drop self.index (set it to None) before a series of updates and
+        call build_index once afterwards to avoid that.
+        @return: None
+        """
+        if self.index is not None:
+            self.index = InvertedIndex.from_results(self.results)
+
+    def _execute_parallel(self, pending, workers):
+        """
+        Executes the parser on the pending files in worker processes
+        Workers write each result into a shared-memory segment that is attached here without copying
+        @param pending: Iterator of (file_name, file_path, kwargs)
+        @param workers: Number of worker processes
+        @return: Iterator of (file_name, SharedResult), in file order
+        """
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(self.parser,)) as executor:
+            # Keep a bounded number of files in flight so that prefetched contents do not pile up
+            in_flight = deque()
+            try:
+                for file_name, file_path, kwargs in pending:
+                    in_flight.append((file_name, executor.submit(execute_shared, file_name, file_path, kwargs)))
+                    if len(in_flight) >= 2 * workers:
+                        file_name, future = in_flight.popleft()
+                        yield file_name, SharedResult(future.result())
+
+                while in_flight:
+                    file_name, future = in_flight.popleft()
+                    yield file_name, SharedResult(future.result())
+            finally:
+                # After a failure or an abandoned run, only this process can unlink the segments of finished files
+                for _, future in in_flight:
+                    future.cancel()
+                for _, future in in_flight:
+                    if not future.cancelled() and future.exception() is None:
+                        discard_shared(future.result())
+
+    def _pending_files(self, done):
+        """
+        Iterates over the files that still have to be analyzed
+        @param done: Names of the files to skip
+        @return: Iterator of (file_name, file_path, kwargs for the parser)
+        """
+        # A FileSource reads the next files in the background while the current one is being analyzed
+        if isinstance(self.files, FileSource):
+            for file_name, file_path, file_content in self.files.prefetch(exclude=done):
+                yield file_name, file_path, dict(self.kwargs, file_content=file_content)
+            return
+
         for file_name, file_path in self.files:
-            self.results[file_name] = self.parser.execute(file_name, file_path, kwargs=self.kwargs)
+            if file_name not in done:
+                yield file_name, file_path, self.kwargs
+
+    def corpus_estimates(self, confidence=0.95):
+        """
+        Combines the per-file results into corpus-level estimates with confidence intervals
+        Files analyzed with an approximate Analyze step (sample_size or target_error) carry their sampling error over
+        @param confidence: Confidence level of the intervals (default: 0.95)
+        @return: Dictionary mapping word_count, avg_polarity and avg_subjectivity (those every file has) to estimates
+        """
+        keys = [key for key in ("word_count", "avg_polarity", "avg_subjectivity")
+                if self.results and all(key in result_dict for result_dict in self.results.values())]
+        return {key: combine_estimates(self.results, key, confidence) for key in keys}
+
+    def build_index(self, directory=None):
+        """
+        Builds an inverted index over the processed text of the analyzed files
+        @param directory: OPTIONAL directory to save the index to, so that it can be memory-mapped later
+        @return: The built InvertedIndex (also stored as self.index)
+        """
+        self.index = InvertedIndex.from_results(self.results)
+        if directory is not None:
+            self.index.save(directory)
+        return self.index
 
     def visualize_pipeline(self, steps):
         """
@@ -61,8 +301,10 @@ class NLPAnalyzer:
             # Determine words to include based on word_list or top k words
             words_to_use = word_list if word_list else [word for word, _ in word_freq.most_common(k)]
 
-            for word, count in word_freq.items():
-                if word in words_to_use:
+            # Look the words up directly instead of scanning the whole Counter
+            for word in dict.fromkeys(words_to_use):
+                count = word_freq.get(word, 0)
+                if count:
                     # Determine the number of times the word appears
                     rows_to_add = min(count, k) if word_list else count
                     # Create DataFrame for the word occurrences
@@ -0,0 +1,310 @@
+"""
+Class to index processed files for fast term lookup
+index.py: Implements the InvertedIndex class and the Index pipeline step
+"""
+__author__ = "Srihari Raman"
+
+# Imports
+import json
+import os
+from collections import Counter
+from typing import Dict, Any, Iterable, List, Tuple
+import numpy as np
+
+from src.exceptions.index_exceptions import IndexFormatError
+
+INDEX_FORMAT_VERSION = 1
+
+
+def processed_sentences(result_dict: Dict[str, Any], file_name: str) -> List[str]:
+    """
+    Returns the processed sentences of a file's result dictionary <br><br>
+    Process steps store the processed text at the top level of the result dictionary, while a pipeline made only of
+    Load steps leaves it under the file name. <br><br>
+    @param result_dict: Result dictionary produced by Pipeline.execute
+    @param file_name: Name of file
+    @return: List of processed sentences
+    """
+    if "processed_text" in result_dict:
+        return result_dict["processed_text"]
+    return result_dict[file_name]["processed_text"]
+
+
+def document_terms(result_dict: Dict[str, Any], file_name: str) -> set:
+    """
+    Returns the distinct terms of a file, tokenized the same way as the index <br><br>
+    Uses the word_frequency analysis when the pipeline ran it, so that results without text (such as those of a
+    StageScheduler) still have terms. <br><br>
+    @param result_dict: Result dictionary produced by Pipeline.execute
+    @param file_name: Name of file
+    @return: Set of terms, or None if the result has neither word frequencies nor processed text
+    """
+    if "word_frequency" in result_dict:
+        return set(result_dict["word_frequency"])
+    if "processed_text" not in result_dict and file_name not in result_dict:
+        return None
+    return {term for sentence in processed_sentences(result_dict, file_name) for term in sentence.split()}
+
+
+class InvertedIndex:
+    """
+    Class implementation of a compact inverted index <br><br>
+    Maps every term to the sentences (and therefore files) it occurs in. Sentences are numbered globally across the
+    corpus; each term's sentence ids are stored sorted and delta-encoded in one flat uint32 array, alongside the number
+    of occurrences of the term in each sentence. The arrays can be saved to a directory and memory-mapped back. <br><br>
+    """
+
+    def __init__(self, vocabulary, term_offsets, postings, counts, file_names, file_offsets):
+        """
+        Constructor to take in the index arrays (use InvertedIndex.build or InvertedIndex.load instead) <br><br>
+        @param vocabulary: Sorted list of terms
+        @param term_offsets: Array of len(vocabulary) + 1 offsets of each term's postings
+        @param postings: Delta-encoded global sentence ids of every term
+        @param counts: Occurrences of the term in each posting's sentence
+        @param file_names: List of file names in corpus order
+        @param file_offsets: Array of len(file_names) + 1 global sentence ids at which each file starts
+        """
+        self.vocabulary = vocabulary
+        self.term_offsets = term_offsets
+        self.postings = postings
+        self.counts = counts
+        self.file_names = file_names
+        self.file_offsets = file_offsets
+        self._term_ids = {term: i for i, term in enumerate(vocabulary)}
+        self._file_ids = {name: i for i, name in enumerate(file_names)}
+
+    @classmethod
+    def build(cls, files: Iterable[Tuple]) -> "InvertedIndex":
+        """
+        Builds an index from (file_name, sentences) pairs <br><br>
+        Terms are the whitespace-separated words of each sentence, matching the word_frequency analysis. A file may
+        also carry the multiplicity of each of its sentences (as set by the 'dedup' process step): postings still point
+        at the unique sentences, but occurrence counts are multiplied so that frequency matches word_frequency. <br><br>
+        @param files: Iterable of (file_name, list of processed sentences) or (file_name, sentences, multiplicities)
+        @return: The built InvertedIndex
+        """
+        term_postings = {}
+        file_names = []
+        file_offsets = [0]
+        sentence_id = 0
+
+        for file_name, sentences, *multiplicity in files:
+            file_names.append(file_name)
+            multiplicity = multiplicity[0] if multiplicity and multiplicity[0] is not None else [1] * len(sentences)
+            for sentence, copies in zip(sentences, multiplicity):
+                for term, count in Counter(sentence.split()).items():
+                    term_postings.setdefault(term, []).append((sentence_id, count * copies))
+                sentence_id += 1
+            file_offsets.append(sentence_id)
+
+        vocabulary = sorted(term_postings)
+        term_offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        for i, term in enumerate(vocabulary):
+            term_offsets[i + 1] = term_offsets[i] + len(term_postings[term])
+
+        postings = np.empty(int(term_offsets[-1]), dtype=np.uint32)
+        counts = np.empty(int(term_offsets[-1]), dtype=np.uint32)
+        for i, term in enumerate(vocabulary):
+            ids, term_counts = zip(*term_postings[term])
+            start, end = term_offsets[i], term_offsets[i + 1]
+            # Sentence ids are appended in increasing order, so the deltas are never negative
+            postings[start:end] = np.diff(np.asarray(ids, dtype=np.int64), prepend=0)
+            counts[start:end] = term_counts
+
+        return cls(vocabulary, term_offsets, postings, counts, file_names,
+                   np.asarray(file_offsets, dtype=np.int64))
+
+    @classmethod
+    def from_results(cls, results: Dict[str, Dict[str, Any]]) -> "InvertedIndex":
+        """
+        Builds an index from the results of NLPAnalyzer.analyze <br><br>
+        @param results: Dictionary mapping file names to their pipeline result dictionaries
+        @return: The built InvertedIndex
+        """
+        return cls.build((file_name, processed_sentences(result_dict, file_name),
+                          result_dict.get("sentence_multiplicity"))
+                         for file_name, result_dict in results.items())
+
+    def save(self, directory: str):
+        """
+        Saves the index arrays to a directory as .npy files so that they can be memory-mapped <br><br>
+        @param directory: Directory to save the index to (created if missing)
+        @return: None
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name in ("term_offsets", "postings", "counts", "file_offsets"):
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+
+        with open(os.path.join(directory, "meta.json"), 'w', encoding='utf-8') as file:
+            json.dump({"version": INDEX_FORMAT_VERSION, "vocabulary": self.vocabulary,
+                       "file_names": self.file_names}, file)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "InvertedIndex":
+        """
+        Loads an index saved with InvertedIndex.save <br><br>
+        @param directory: Directory the index was saved to
+        @param mmap: Memory-map the arrays instead of reading them into memory (default: True)
+        @return: The loaded InvertedIndex
+        """
+        try:
+            with open(os.path.join(directory, "meta.json"), 'r', encoding='utf-8') as file:
+                meta = json.load(file)
+        except FileNotFoundError:
+            raise IndexFormatError(directory, "meta.json is missing")
+
+        if meta.get("version") != INDEX_FORMAT_VERSION:
+            raise IndexFormatError(directory, f"unsupported version {meta.get('version')}")
+
+        mmap_mode = 'r' if mmap else None
+        arrays = [np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+                  for name in ("term_offsets", "postings", "counts", "file_offsets")]
+        term_offsets, postings, counts, file_offsets = arrays
+
+        return cls(meta["vocabulary"], term_offsets, postings, counts, meta["file_names"], file_offsets)
+
+    def __contains__(self, term):
+        return term in self._term_ids
+
+    def __len__(self):
+        return len(self.vocabulary)
+
+    def _slice(self, term: str) -> Tuple[int, int]:
+        """
+        Returns the [start, end) range of a term's postings (empty for unknown terms)
+        """
+        term_id = self._term_ids.get(term)
+        if term_id is None:
+            return 0, 0
+        return int(self.term_offsets[term_id]), int(self.term_offsets[term_id + 1])
+
+    def sentence_ids(self, term: str) -> np.ndarray:
+        """
+        Decodes the sorted global sentence ids containing a term <br><br>
+        @param term: Term to look up
+        @return: Array of global sentence ids
+        """
+        start, end = self._slice(term)
+        return np.cumsum(self.postings[start:end], dtype=np.int64)
+
+    def _locate(self, sentence_ids: np.ndarray) -> List[Tuple[str, int]]:
+        """
+        Converts global sentence ids into (file_name, sentence index within the file) pairs
+        """
+        file_ids = np.searchsorted(self.file_offsets, sentence_ids, side='right') - 1
+        local_ids = sentence_ids - self.file_offsets[file_ids]
+        return [(self.file_names[f], int(s)) for f, s in zip(file_ids, local_ids)]
+
+    def _files(self, sentence_ids: np.ndarray) -> List[str]:
+        """
+        Converts global sentence ids into the sorted unique names of the files containing them
+        """
+        file_ids = np.unique(np.searchsorted(self.file_offsets, sentence_ids, side='right') - 1)
+        return [self.file_names[f] for f in file_ids]
+
+    def lookup(self, term: str, level: str = "sentence") -> List:
+        """
+        Finds where a term occurs <br><br>
+        @param term: Term to look up
+        @param level: "sentence" for (file_name, sentence index) pairs, "file" for file names (default: "sentence")
+        @return: List of sentence locations or file names
+        """
+        return self._resolve(self.sentence_ids(term), level)
+
+    def and_query(self, terms: Iterable[str], level: str = "sentence") -> List:
+        """
+        Finds the sentences (or files) containing every one of the terms <br><br>
+        @param terms: Terms that must all occur
+        @param level: "sentence" to intersect sentences, "file" to intersect files (default: "sentence")
+        @return: List of sentence locations or file names
+        """
+        # Intersect the shortest posting lists first to keep intermediate results small
+        id_lists = sorted((self.sentence_ids(term) for term in terms), key=len)
+        if not id_lists:
+            return []
+
+        if level == "file":
+            file_sets = [set(self._files(ids)) for ids in id_lists]
+            return sorted(set.intersection(*file_sets), key=self._file_ids.get)
+
+        result = id_lists[0]
+        for ids in id_lists[1:]:
+            result = np.intersect1d(result, ids, assume_unique=True)
+        return self._resolve(result, level)
+
+    def or_query(self, terms: Iterable[str], level: str = "sentence") -> List:
+        """
+        Finds the sentences (or files) containing any of the terms <br><br>
+        @param terms: Terms of which at least one must occur
+        @param level: "sentence" for (file_name, sentence index) pairs, "file" for file names (default: "sentence")
+        @return: List of sentence locations or file names
+        """
+        id_lists = [self.sentence_ids(term) for term in terms]
+        if not id_lists:
+            return []
+        return self._resolve(np.unique(np.concatenate(id_lists)), level)
+
+    def _resolve(self, sentence_ids: np.ndarray, level: str) -> List:
+        """
+        Converts global sentence ids into the requested level of result
+        """
+        if level == "sentence":
+            return self._locate(sentence_ids)
+        if level == "file":
+            return self._files(sentence_ids)
+        raise ValueError(f"Unsupported query level {level}")
+
+    def frequency(self, term: str, file_name: str = None):
+        """
+        Counts the occurrences of a term <br><br>
+        @param term: Term to count
+        @param file_name: File to count in (default: count per file)
+        @return: Occurrences in file_name, or a dictionary of file name -> occurrences for every file containing the term
+        """
+        start, end = self._slice(term)
+        sentence_ids = self.sentence_ids(term)
+        counts = self.counts[start:end]
+
+        if file_name is not None:
+            file_id = self._file_ids[file_name]
+            lo, hi = np.searchsorted(sentence_ids, self.file_offsets[file_id:file_id + 2])
+            return int(counts[lo:hi].sum())
+
+        file_ids = np.searchsorted(self.file_offsets, sentence_ids, side='right') - 1
+        totals = np.bincount(file_ids, weights=counts, minlength=len(self.file_names))
+        return {self.file_names[f]: int(totals[f]) for f in np.flatnonzero(totals)}
+
+
+class Index:
+    """
+    Class implementation of the Indexing part of the pipeline <br><br>
+    This optional step collects the processed sentences of every file it runs on so that an InvertedIndex over the
+    whole corpus can be built once the pipeline has finished. It leaves the result dictionary unchanged. <br><br>
+    The sentences are kept in the step object itself, so the step only works when the pipeline runs in this process.
+    With NLPAnalyzer.analyze(workers=...) or a Coordinator, the step runs in copies held by the workers and this
+    object's index stays empty; use NLPAnalyzer.build_index() after the run instead. A StageScheduler, which only sees
+    one batch of a file at a time, rejects the step. <br><br>
+    """
+
+    def __init__(self):
+        self._files = {}
+
+    def run(self, result_dict: Dict[str, Any], file_name, **kwargs: Dict[str, Any]):
+        """
+        Pipeline execution function to index the file <br><br>
+        @param result_dict: Result dictionary to read the processed text from
+        @param file_name: Name of file
+        @param kwargs (Dict[str, Any]): OPTIONAL Keyword arguments to aid in the processing of functions
+        @return: result_dict, unchanged
+        """
+        self._files[file_name] = (list(processed_sentences(result_dict, file_name)),
+                                  result_dict.get("sentence_multiplicity"))
+        return result_dict
+
+    @property
+    def index(self) -> InvertedIndex:
+        """
+        Builds the InvertedIndex over every file seen so far
+        """
+        return InvertedIndex.build((file_name, sentences, multiplicity)
+                                   for file_name, (sentences, multiplicity) in self._files.items())
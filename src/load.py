@@ -5,13 +5,23 @@ load.py: Class implementation of Loader
 __author__ = "Srihari Raman"
 
 # Imports
-from typing import Dict, Any
+import io
+import json
+from typing import Dict, Any, Iterable, Iterator, List
 import pandas as pd
 from nltk import sent_tokenize
 
 from src.exceptions.load_exceptions import UnsupportedFileTypeError, ArgError
+from src.metrics import SENTENCES
+from src.source import file_type_of, open_text, read_text
 import nltk
 
+try:
+    # orjson parses JSON several times faster than the standard library, but it is optional
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
 nltk.download('punkt')
 
 class Load:
@@ -24,7 +34,10 @@ class Load:
         self.map = {
             'csv': self._process_csv,
             'txt': self._process_txt,
-            'str': self._process_str
+            'str': self._process_str,
+            'jsonl': self._process_jsonl,
+            'parquet': self._process_parquet,
+            'auto': self._process_auto
         }
 
         if file_type not in self.map.keys():
@@ -61,8 +74,137 @@ class Load:
         except Exception as e:
             raise e
 
+        SENTENCES.inc(len(result_dict[file_name]["processed_text"]), stage='load', type=self.file_type)
         return result_dict
 
+    def iter_batches(self, file_name: str, batch_size: int = 1000, **kwargs: Dict[str, Any]) -> Iterator[List[str]]:
+        """
+        Streams the sentences of a file in batches instead of loading them all at once.
+
+        The file is read incrementally (CSV in chunks, JSONL line by line, Parquet by record batch and text files
+        paragraph by paragraph) and only one batch of sentences is built at a time, so that memory use does not grow
+        with the size of the file. Text files are split into sentences one paragraph at a time, and the last sentence
+        of each paragraph is split again together with the next one, since a sentence boundary is only settled by the
+        text that follows it, so the sentences are the same as those of the whole file.
+
+        Parameters:
+        - file_name (str): The name of the file to be processed.
+        - batch_size (int): The number of sentences per batch. The last batch may be smaller.
+        - kwargs (Dict[str, Any]): OPTIONAL Keyword arguments to aid in the processing of functions
+
+        Returns:
+        Iterator[List[str]]: Batches of consecutive sentences of the file.
+
+        Raises:
+        ArgError: If an argument required by the file type is not passed in kwargs.
+        UnsupportedFileTypeError: If the file type is not supported for processing.
+        """
+        kwargs = {key: value for key, value in kwargs['kwargs'].items() if value is not None}
+
+        file_type = self.file_type
+        if file_type == 'auto':
+            try:
+                file_type = file_type_of(kwargs["filepath"])
+            except KeyError:
+                raise ArgError("filepath")
+
+        batch = []
+        carry = ''
+        for text in self._iter_texts(file_type, kwargs):
+            sentences = sent_tokenize(carry + text)
+            if file_type == 'txt' and sentences:
+                # The paragraphs are consecutive slices of the file, and every sentence is a slice of its text
+                text = carry + text
+                carry = text[text.rfind(sentences[-1]):]
+                sentences.pop()
+            batch.extend(sentences)
+            while len(batch) >= batch_size:
+                yield batch[:batch_size]
+                batch = batch[batch_size:]
+
+        batch.extend(sent_tokenize(carry) if carry else [])
+        while len(batch) > batch_size:
+            yield batch[:batch_size]
+            batch = batch[batch_size:]
+        if batch:
+            yield batch
+
+    def _iter_texts(self, file_type: str, kwargs: Dict[str, Any]) -> Iterator[str]:
+        """
+        Reads a file incrementally and yields the pieces of text to split into sentences.
+
+        Parameters:
+        - file_type (str): The type of the file.
+        - kwargs (Dict[str, Any]): Keyword arguments of the file, without None values.
+
+        Returns:
+        Iterator[str]: Texts in file order (rows, records or paragraphs). The paragraphs of a text file keep their
+        blank lines, so that they join back into the whole file.
+        """
+        if file_type == 'str':
+            try:
+                yield kwargs["file_text"]
+            except KeyError:
+                raise ArgError("file_text")
+
+        elif file_type == 'txt':
+            try:
+                file_path = kwargs["file_path"] if "file_path" in kwargs else kwargs["filepath"]
+            except KeyError:
+                raise ArgError("file_path")
+
+            with (io.StringIO(kwargs["file_content"]) if "file_content" in kwargs else open_text(file_path)) as file:
+                paragraph = []
+                has_text = ended = False
+                for line in file:
+                    if line.strip():
+                        if ended:
+                            yield ''.join(paragraph)
+                            paragraph = []
+                            ended = False
+                        has_text = True
+                    else:
+                        ended = has_text
+                    paragraph.append(line)
+                if paragraph:
+                    yield ''.join(paragraph)
+
+        elif file_type == 'csv':
+            try:
+                trg_text_col = kwargs["csv_target_text_col"]
+                filepath = kwargs["filepath"]
+            except KeyError:
+                raise ArgError(["csv_target_text_col", "filepath"])
+
+            source = io.StringIO(kwargs["file_content"]) if "file_content" in kwargs else filepath
+            with pd.read_csv(source, usecols=[trg_text_col], chunksize=kwargs.get("csv_chunk_size", 10000)) as chunks:
+                for chunk in chunks:
+                    yield from chunk[trg_text_col]
+
+        elif file_type == 'jsonl':
+            try:
+                trg_text_key = kwargs["jsonl_target_text_key"]
+                filepath = kwargs["filepath"]
+            except KeyError:
+                raise ArgError(["jsonl_target_text_key", "filepath"])
+
+            with (io.StringIO(kwargs["file_content"]) if "file_content" in kwargs else open_text(filepath)) as file:
+                yield from self._jsonl_texts(file, trg_text_key)
+
+        elif file_type == 'parquet':
+            import pyarrow.parquet as pq
+            try:
+                trg_text_col = kwargs["parquet_target_text_col"]
+                filepath = kwargs["filepath"]
+            except KeyError:
+                raise ArgError(["parquet_target_text_col", "filepath"])
+
+            yield from self._parquet_texts(pq.ParquetFile(filepath), trg_text_col,
+                                           kwargs.get("parquet_batch_size", 65536))
+
+        else:
+            raise UnsupportedFileTypeError(file_type)
+
     def _process_csv(self, result_dict: Dict[str, Any], file_name: str, **kwargs: Dict[str, Any]) -> Dict[str, Any]:
         """
         Service function to process CSV files
@@ -102,17 +244,155 @@ class Load:
         # Assert that the target text column is of type str
         assert isinstance(trg_text_col, str), "CSV text column must be of type str"
 
-        # Read in text from CSV column into a list
-        df = pd.read_csv(filepath)
+        # Read in text from CSV column into a list (pandas decompresses gzip, bz2, xz and zstd files by extension)
+        if "file_content" in kwargs:
+            df = pd.read_csv(io.StringIO(kwargs["file_content"]))
+        else:
+            df = pd.read_csv(filepath)
+
+        # Split the text of each row into sentences
+        all_sentences = self._split_sentences(df.loc[:, trg_text_col])
+
+        # Update the result dictionary
+        result_dict[file_name]["raw_text"] = all_sentences
+        result_dict[file_name]["processed_text"] = all_sentences
+
+        return result_dict
+
+    @staticmethod
+    def _split_sentences(texts: Iterable[str]) -> List[str]:
+        """
+        Splits every text of a column into sentences and concatenates them into a single list
+
+        Parameters:
+        - texts (Iterable[str]): The texts of the column, one per row.
 
+        Returns:
+        List[str]: The sentences of all the texts, in order.
+        """
         # Initialize the list to store individual sentences
         all_sentences = []
 
         # Iterate over each row and split the text into sentences
-        for text in df.loc[:, trg_text_col]:
+        for text in texts:
             sentences = sent_tokenize(text)
             all_sentences.extend(sentences)
 
+        return all_sentences
+
+    @staticmethod
+    def _jsonl_texts(lines: Iterable[str], trg_text_key: str) -> Iterator[str]:
+        """
+        Parses JSON Lines one line at a time and yields the non-null text under the target key of each record
+        """
+        for line in lines:
+            if line.strip():
+                text = json_loads(line).get(trg_text_key)
+                if text is not None:
+                    yield text
+
+    @staticmethod
+    def _parquet_texts(parquet_file, trg_text_col: str, batch_size: int) -> Iterator[str]:
+        """
+        Streams the non-null texts of one Parquet column, one record batch at a time
+        """
+        for batch in parquet_file.iter_batches(batch_size=batch_size, columns=[trg_text_col]):
+            for text in batch.column(0).to_pylist():
+                if text is not None:
+                    yield text
+
+    def _process_jsonl(self, result_dict: Dict[str, Any], file_name: str, **kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Service function to process JSON Lines files
+
+        This function parses the file one line at a time (with orjson if it is installed), extracts the text under
+        the specified key of each record and splits it into sentences like the CSV loader. Records without the key
+        or with a null value are skipped. Compressed files are decompressed transparently.
+
+        Parameters:
+        - result_dict (Dict[str, Any]): The result dictionary to be updated with the process results. It's a dictionary
+        with string keys and values of any type.
+        - file_name (str): The name of the file to be processed. It's
+          expected to be a string.
+        - kwargs (Dict[str, Any]): OPTIONAL Keyword arguments to aid in the processing of
+
+        Returns:
+        Dict[str, Any]: The updated result dictionary containing the new results after processing the file.
+
+        Raises:
+        ArgError: If the JSONL text key or the file path is not specified in the keyword arguments.
+        """
+        # Initialize the result dictionary
+        result_dict[file_name] = {}
+        kwargs = {key: value for key, value in kwargs['kwargs'].items() if value is not None}
+
+        # Check if required parameters are passed in kwargs
+        try:
+            trg_text_key = kwargs["jsonl_target_text_key"]
+            filepath = kwargs["filepath"]
+        except KeyError:
+            raise ArgError(["jsonl_target_text_key", "filepath"])
+
+        # Assert that the target text key is of type str
+        assert isinstance(trg_text_key, str), "JSONL text key must be of type str"
+
+        if "file_content" in kwargs:
+            all_sentences = self._split_sentences(self._jsonl_texts(io.StringIO(kwargs["file_content"]), trg_text_key))
+        else:
+            with open_text(filepath) as file:
+                all_sentences = self._split_sentences(self._jsonl_texts(file, trg_text_key))
+
+        # Update the result dictionary
+        result_dict[file_name]["raw_text"] = all_sentences
+        result_dict[file_name]["processed_text"] = all_sentences
+
+        return result_dict
+
+    def _process_parquet(self, result_dict: Dict[str, Any], file_name: str,
+                         **kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Service function to process Parquet files
+
+        This function reads only the specified text column through Arrow, streaming it one record batch at a time
+        instead of materializing a DataFrame, and splits each text into sentences like the CSV loader. Null values
+        are skipped.
+
+        Parameters:
+        - result_dict (Dict[str, Any]): The result dictionary to be updated with the process results. It's a dictionary
+        with string keys and values of any type.
+        - file_name (str): The name of the file to be processed. It's
+          expected to be a string.
+        - kwargs (Dict[str, Any]): OPTIONAL Keyword arguments to aid in the processing of
+
+        Returns:
+        Dict[str, Any]: The updated result dictionary containing the new results after processing the file.
+
+        Raises:
+        ArgError: If the Parquet text column or the file path is not specified in the keyword arguments.
+        ImportError: If pyarrow is not installed.
+        """
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Loading Parquet files requires the pyarrow package (pip install pyarrow)")
+
+        # Initialize the result dictionary
+        result_dict[file_name] = {}
+        kwargs = {key: value for key, value in kwargs['kwargs'].items() if value is not None}
+
+        # Check if required parameters are passed in kwargs
+        try:
+            trg_text_col = kwargs["parquet_target_text_col"]
+            filepath = kwargs["filepath"]
+        except KeyError:
+            raise ArgError(["parquet_target_text_col", "filepath"])
+
+        # Assert that the target text column is of type str
+        assert isinstance(trg_text_col, str), "Parquet text column must be of type str"
+
+        texts = self._parquet_texts(pq.ParquetFile(filepath), trg_text_col, kwargs.get("parquet_batch_size", 65536))
+        all_sentences = self._split_sentences(texts)
+
         # Update the result dictionary
         result_dict[file_name]["raw_text"] = all_sentences
         result_dict[file_name]["processed_text"] = all_sentences
@@ -147,6 +427,8 @@ class Load:
         Note:
             NLTK's 'punkt' tokenizer dataset is required for this function. Ensure it's downloaded
             using `nltk.download('punkt')` before calling this function.
+            Compressed files (.gz, .bz2, .xz, .zst) are decompressed transparently, and text already read
+            by a FileSource can be passed as `file_content` to skip reading the file again.
         """
         # Initialize the result dictionary
         result_dict[file_name] = {}
@@ -155,7 +437,7 @@ class Load:
 
         # Check if required parameters are passed in kwargs
         try:
-            file_path = kwargs["file_path"]
+            file_path = kwargs["file_path"] if "file_path" in kwargs else kwargs["filepath"]
         except KeyError:
             raise ArgError("file_path")
         except Exception as e:
@@ -163,8 +445,7 @@ class Load:
 
         # Process the text file and store it in the result dictionary
         try:
-            with open(file_path, 'r') as file:
-                text = file.read()
+            text = kwargs["file_content"] if "file_content" in kwargs else read_text(file_path)
 
             # Using nltk for sentence tokenization
             sentences = nltk.tokenize.sent_tokenize(text)
@@ -235,3 +516,37 @@ class Load:
         result_dict[file_name]["processed_text"] = sentences
 
         return result_dict
+
+    def _process_auto(self, result_dict: Dict[str, Any], file_name: str, **kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Processes a file according to its extension
+
+        This function lets one pipeline load a directory of mixed files, e.g. from a FileSource. The file type is
+        inferred from the extension of the file path, ignoring any compression suffix (so `notes.txt.gz` is
+        processed as a text file), and the file is delegated to the matching handler.
+
+        Parameters:
+            - result_dict (Dict[str, Any]): A dictionary to be updated with the processed results.
+                    The dictionary has string keys and values of any type.
+            - file_name (str): The name of the file to be processed.
+            - kwargs (Dict[str, Any]): OPTIONAL Keyword arguments to aid in the processing of
+
+        Returns:
+            Dict[str, Any]: The updated result dictionary of the delegated handler.
+
+        Raises:
+            ArgError: If the file path is not passed in kwargs.
+            UnsupportedFileTypeError: If the inferred file type is not supported for processing.
+        """
+        file_kwargs = {key: value for key, value in kwargs['kwargs'].items() if value is not None}
+
+        try:
+            file_path = file_kwargs["filepath"]
+        except KeyError:
+            raise ArgError("filepath")
+
+        file_type = file_type_of(file_path)
+        if file_type not in self.map or file_type in ('auto', 'str'):
+            raise UnsupportedFileTypeError(file_type)
+
+        return self.map[file_type](result_dict, file_name, **kwargs)
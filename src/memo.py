@@ -0,0 +1,101 @@
+"""
+Class to memoize sentence sentiment scores
+memo.py: Implements the SentimentMemo class
+"""
+__author__ = "Reema Sharma"
+
+import hashlib
+import sqlite3
+from typing import Tuple
+from textblob import TextBlob
+
+
+class SentimentMemo:
+    """
+    Class implementation of a sentence -> (polarity, subjectivity) memo <br><br>
+    Scores are kept in memory and, when a path is given, in a SQLite database so that they survive across runs.
+    Sentences are keyed by a hash of their exact text. <br><br>
+    """
+
+    def __init__(self, path: str = None):
+        """
+        Constructor to take in an optional database path <br><br>
+        @param path: Path of the SQLite database to persist scores to (default: in-memory only)
+        """
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._scores = {}
+        self._pending = {}
+        self._connection = None
+
+    @staticmethod
+    def _key(sentence: str) -> bytes:
+        return hashlib.blake2b(sentence.encode('utf-8'), digest_size=16).digest()
+
+    def _connect(self):
+        """
+        Opens the database on first use
+        """
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path)
+            self._connection.execute("CREATE TABLE IF NOT EXISTS sentiment "
+                                     "(key BLOB PRIMARY KEY, polarity REAL, subjectivity REAL)")
+        return self._connection
+
+    def score(self, sentence: str) -> Tuple[float, float]:
+        """
+        Returns the TextBlob sentiment of a sentence, computing it only if it has not been seen before <br><br>
+        @param sentence: Sentence to score
+        @return: Tuple of (polarity, subjectivity)
+        """
+        key = self._key(sentence)
+        scores = self._scores.get(key)
+
+        if scores is None and self.path is not None:
+            row = self._connect().execute("SELECT polarity, subjectivity FROM sentiment WHERE key = ?",
+                                          (key,)).fetchone()
+            if row is not None:
+                scores = self._scores[key] = tuple(row)
+
+        if scores is not None:
+            self.hits += 1
+            return scores
+
+        self.misses += 1
+        sentiment = TextBlob(sentence).sentiment
+        scores = self._scores[key] = (sentiment.polarity, sentiment.subjectivity)
+        if self.path is not None:
+            self._pending[key] = scores
+        return scores
+
+    def flush(self):
+        """
+        Writes the scores computed since the last flush to the database
+        @return: None
+        """
+        if not self._pending:
+            return
+
+        connection = self._connect()
+        with connection:
+            connection.executemany("INSERT OR REPLACE INTO sentiment VALUES (?, ?, ?)",
+                                   [(key, *scores) for key, scores in self._pending.items()])
+        self._pending.clear()
+
+    def close(self):
+        """
+        Flushes the pending scores and closes the database
+        @return: None
+        """
+        self.flush()
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __getstate__(self):
+        # SQLite connections cannot be pickled, so the copy reopens the database on first use
+        self.flush()
+        state = self.__dict__.copy()
+        state['_connection'] = None
+        return state
@@ -0,0 +1,490 @@
+"""
+Runtime metrics for the NLP framework
+metrics.py: Implementation of the metrics registry, its Prometheus and JSON-lines exporters and ProgressReporter
+"""
+__author__ = "Srihari Raman"
+
+# Imports
+import bisect
+import datetime
+import json
+import math
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, Tuple
+
+from src.aggregate import sentence_weight
+
+# Upper bounds in seconds of the default latency histogram buckets
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def _label_key(labels: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: Iterable[Tuple[str, str]]) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in key]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """
+    Class implementation of a named metric with optional labels <br><br>
+    Every distinct set of label values is its own sample; updates are thread-safe. <br><br>
+    """
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str):
+        """
+        Constructor to take in the metric's name and help text <br><br>
+        @param name: Metric name, e.g. 'linguisight_files_total'
+        @param documentation: Help text shown by the exporters
+        """
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def samples(self) -> Dict[Tuple[Tuple[str, str], ...], Any]:
+        """
+        Returns a copy of the current value of every label set
+        @return: Dictionary mapping sorted (label, value) tuples to values
+        """
+        with self._lock:
+            return dict(self._values)
+
+
+class CounterMetric(Metric):
+    """
+    Class implementation of a counter, which only ever goes up
+    """
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        """
+        Increments the counter
+        @param amount: Amount to add (default: 1)
+        @param labels: OPTIONAL label values, e.g. step='stem'
+        @return: None
+        """
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        """
+        Returns the counter's value for a set of labels
+        @param labels: OPTIONAL label values
+        @return: Current value (0 if never incremented)
+        """
+        with self._lock:
+            return self._values.get(_label_key(labels), 0)
+
+
+class Gauge(Metric):
+    """
+    Class implementation of a gauge, a value that can go up and down <br><br>
+    A gauge can also be given a function, which is called for its value whenever the metrics are read. <br><br>
+    """
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, function=None):
+        """
+        Constructor to take in the gauge's name, help text and OPTIONAL value function <br><br>
+        @param name: Metric name
+        @param documentation: Help text shown by the exporters
+        @param function: OPTIONAL function returning the current value, or None when it is unavailable
+        """
+        super().__init__(name, documentation)
+        self.function = function
+
+    def set(self, value: float, **labels):
+        """
+        Sets the gauge
+        @param value: New value
+        @param labels: OPTIONAL label values
+        @return: None
+        """
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def samples(self):
+        if self.function is None:
+            return super().samples()
+        value = self.function()
+        return {} if value is None else {(): value}
+
+
+class Histogram(Metric):
+    """
+    Class implementation of a histogram of observed values, such as latencies, counted into fixed buckets
+    """
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, buckets=DEFAULT_BUCKETS):
+        """
+        Constructor to take in the histogram's name, help text and buckets <br><br>
+        @param name: Metric name
+        @param documentation: Help text shown by the exporters
+        @param buckets: Sorted upper bounds of the buckets; an infinite bucket is added (default: DEFAULT_BUCKETS)
+        """
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        """
+        Records an observation
+        @param value: Observed value
+        @param labels: OPTIONAL label values
+        @return: None
+        """
+        key = _label_key(labels)
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            counts[position] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self):
+        with self._lock:
+            return {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+
+
+class MetricsRegistry:
+    """
+    Class implementation of a registry of metrics <br><br>
+    Metrics are created on first use and returned as they are afterwards, so modules can declare the metrics they
+    update at import time. <br><br>
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, documentation, **options):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, **options)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name: str, documentation: str) -> CounterMetric:
+        """
+        Returns the counter with the given name, creating it if needed
+        @param name: Metric name
+        @param documentation: Help text
+        @return: The counter
+        """
+        return self._get(CounterMetric, name, documentation)
+
+    def gauge(self, name: str, documentation: str, function=None) -> Gauge:
+        """
+        Returns the gauge with the given name, creating it if needed
+        @param name: Metric name
+        @param documentation: Help text
+        @param function: OPTIONAL function returning the current value
+        @return: The gauge
+        """
+        return self._get(Gauge, name, documentation, function=function)
+
+    def histogram(self, name: str, documentation: str, buckets=DEFAULT_BUCKETS) -> Histogram:
+        """
+        Returns the histogram with the given name, creating it if needed
+        @param name: Metric name
+        @param documentation: Help text
+        @param buckets: Upper bounds of the buckets (default: DEFAULT_BUCKETS)
+        @return: The histogram
+        """
+        return self._get(Histogram, name, documentation, buckets=buckets)
+
+    def metrics(self):
+        """
+        Returns the registered metrics in name order
+        """
+        with self._lock:
+            return [self._metrics[name] for name in sorted(self._metrics)]
+
+    def render(self) -> str:
+        """
+        Renders every metric in the Prometheus text exposition format
+        @return: Metrics text
+        """
+        lines = []
+        for metric in self.metrics():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for key, value in sorted(metric.samples().items()):
+                if metric.kind != 'histogram':
+                    lines.append(f"{metric.name}{_format_labels(key)} {_format_value(value)}")
+                    continue
+                counts, total = value
+                cumulative = 0
+                for bound, count in zip(metric.buckets, counts):
+                    cumulative += count
+                    le = (('le', _format_value(bound)),)
+                    lines.append(f"{metric.name}_bucket{_format_labels(key + le)} {cumulative}")
+                lines.append(f"{metric.name}_sum{_format_labels(key)} {_format_value(total)}")
+                lines.append(f"{metric.name}_count{_format_labels(key)} {cumulative}")
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns the current value of every metric as JSON-serializable data
+        @return: Dictionary mapping metric names to lists of {'labels': ..., 'value': ...} samples; histogram values
+                 are {'count': ..., 'sum': ..., 'buckets': {upper bound: count}}
+        """
+        snapshot = {}
+        for metric in self.metrics():
+            samples = []
+            for key, value in sorted(metric.samples().items()):
+                if metric.kind == 'histogram':
+                    counts, total = value
+                    value = {"count": sum(counts), "sum": total,
+                             "buckets": {_format_value(bound): count for bound, count in zip(metric.buckets, counts)}}
+                samples.append({"labels": dict(key), "value": value})
+            snapshot[metric.name] = samples
+        return snapshot
+
+
+def resident_memory_bytes():
+    """
+    Returns the resident memory of this process
+    @return: Bytes of resident memory, the peak where only that is available, or None on unsupported platforms
+    """
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+# Registry updated by the pipeline and its steps; each process has its own
+REGISTRY = MetricsRegistry()
+
+# Files and their sentences are counted where NLPAnalyzer collects the results, whichever way they were run, while
+# step latencies and the per-stage sentence counts are recorded by the process running the steps: for workers= and
+# Coordinator runs they live in the registries of the worker processes (or of the ShardWorker hosts)
+FILES = REGISTRY.counter('linguisight_files_total', 'Files completed by NLPAnalyzer.analyze')
+STEP_SECONDS = REGISTRY.histogram('linguisight_step_seconds', 'Seconds spent in each pipeline step')
+STEP_ERRORS = REGISTRY.counter('linguisight_step_errors_total', 'Pipeline steps that raised an exception')
+SENTENCES = REGISTRY.counter('linguisight_sentences_total', 'Sentences handled by each stage, completed files as corpus')
+CACHE_HITS = REGISTRY.counter('linguisight_cache_hits_total', 'Lookups answered by a cache')
+CACHE_MISSES = REGISTRY.counter('linguisight_cache_misses_total', 'Lookups that missed a cache')
+ETA_SECONDS = REGISTRY.gauge('linguisight_eta_seconds', 'Estimated seconds until the current run finishes')
+REGISTRY.gauge('linguisight_resident_memory_bytes', 'Resident memory of the process', function=resident_memory_bytes)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """
+    HTTP handler answering GET /metrics with the registry in Prometheus text format
+    """
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        payload = self.server.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class MetricsServer:
+    """
+    Class implementation of a Prometheus metrics endpoint <br><br>
+    Serves GET /metrics from a background thread, on localhost unless told otherwise. <br><br>
+    """
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY, host: str = "127.0.0.1", port: int = 9100):
+        """
+        Constructor to start the endpoint <br><br>
+        @param registry: Registry to serve (default: REGISTRY)
+        @param host: Host to listen on (default: 127.0.0.1)
+        @param port: TCP port to listen on, 0 for any free port (default: 9100)
+        """
+        self.httpd = ThreadingHTTPServer((host, port), _MetricsHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.registry = registry
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="linguisight-metrics", daemon=True)
+        self._thread.start()
+
+    @property
+    def server_address(self):
+        """
+        The (host, port) tuple the endpoint listens on
+        """
+        return self.httpd.server_address
+
+    def shutdown(self):
+        """
+        Stops serving and releases the socket
+        @return: None
+        """
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self._thread.join()
+
+
+class JSONLinesWriter:
+    """
+    Class implementation of a periodic metrics writer <br><br>
+    Appends a snapshot of the registry as one JSON line every `interval` seconds, and a last one when closed. <br><br>
+    """
+
+    def __init__(self, path: str, interval: float = 10.0, registry: MetricsRegistry = REGISTRY):
+        """
+        Constructor to start the writer <br><br>
+        @param path: Path of the file to append to
+        @param interval: Seconds between snapshots (default: 10)
+        @param registry: Registry to write (default: REGISTRY)
+        """
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="linguisight-metrics-writer", daemon=True)
+        self._thread.start()
+
+    def write(self):
+        """
+        Appends one snapshot
+        @return: None
+        """
+        line = json.dumps({"time": time.time(), "metrics": self.registry.snapshot()})
+        with open(self.path, 'a') as file:
+            file.write(line + '\n')
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def close(self):
+        """
+        Stops the writer after appending a last snapshot
+        @return: None
+        """
+        self._stop.set()
+        self._thread.join()
+        self.write()
+
+
+class ProgressReporter:
+    """
+    Class implementation of a progress reporter for NLPAnalyzer.analyze <br><br>
+    Counts finished files and their sentences, and reports the throughput and an ETA based on the files per second so
+    far, at most once every `interval` seconds. The ETA is also published as the linguisight_eta_seconds gauge. <br><br>
+    """
+
+    def __init__(self, total: int = None, interval: float = 10.0, stream=None):
+        """
+        Constructor to take in the run's size and where to report <br><br>
+        @param total: OPTIONAL number of files of the run; NLPAnalyzer.analyze fills it in when not given
+        @param interval: Minimum seconds between two reports (default: 10)
+        @param stream: OPTIONAL stream to report to (default: sys.stderr)
+        """
+        self.total = total
+        self.interval = interval
+        self.stream = stream
+        self.files = 0
+        self.sentences = 0
+        self.started = None
+        self._reported = None
+
+    def start(self, total: int = None):
+        """
+        Starts timing the run
+        @param total: OPTIONAL number of files of the run, used unless one was given to the constructor
+        @return: None
+        """
+        if self.total is None:
+            self.total = total
+        self.started = self._reported = time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started if self.started is not None else 0.0
+
+    @property
+    def eta(self):
+        """
+        Estimated seconds until the run finishes, or None before the first file or without a total
+        """
+        if self.total is None or not self.files:
+            return None
+        return max(0, self.total - self.files) * self.elapsed / self.files
+
+    def update(self, file_name: str, result_dict: Dict[str, Any]):
+        """
+        Records a finished file, reporting if the interval has passed
+        @param file_name: Name of file
+        @param result_dict: Result dictionary of the file
+        @return: None
+        """
+        if self.started is None:
+            self.start()
+        self.files += 1
+        try:
+            self.sentences += sentence_weight(result_dict, file_name)
+        except KeyError:
+            pass
+        if self.eta is not None:
+            ETA_SECONDS.set(self.eta)
+        if time.monotonic() - self._reported >= self.interval:
+            self.report()
+
+    def format(self) -> str:
+        """
+        Describes the progress so far
+        @return: e.g. '120/1000 files (12.0%), 350.2 sentences/s, 1.3 files/s, ETA 0:11:17'
+        """
+        elapsed = self.elapsed or 1e-9
+        done = f"{self.files}/{self.total} files ({100 * self.files / self.total:.1f}%)" if self.total \
+            else f"{self.files} files"
+        eta = self.eta
+        eta = "unknown" if eta is None else str(datetime.timedelta(seconds=round(eta)))
+        return (f"{done}, {self.sentences / elapsed:.1f} sentences/s, {self.files / elapsed:.1f} files/s, "
+                f"ETA {eta}")
+
+    def report(self):
+        """
+        Writes the progress line
+        @return: None
+        """
+        self._reported = time.monotonic()
+        print(self.format(), file=self.stream or sys.stderr, flush=True)
+
+    def finish(self):
+        """
+        Writes a final progress line
+        @return: None
+        """
+        ETA_SECONDS.set(0)
+        self.report()
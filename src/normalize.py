@@ -0,0 +1,119 @@
+"""
+Vectorized text normalization
+normalize.py: Lowercasing, punctuation stripping and whitespace collapsing over whole batches of sentences
+"""
+__author__ = "Sriya Vuppala"
+
+# Imports
+import re
+from typing import List
+import pandas as pd
+
+# Characters removed by punctuation stripping, the same as Process.filter_punctuation has always removed
+PUNCTUATION_PATTERN = re.compile(r'[^\w\s]')
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# Joins a batch into one string so that each normalization is a single call; it is whitespace, so no step changes it
+_SEPARATOR = '\x1f'
+
+
+class _PunctuationTable(dict):
+    """
+    Class implementation of a str.translate table deleting punctuation <br><br>
+    Every code point is classified with PUNCTUATION_PATTERN the first time it is seen and remembered, so the table
+    matches the regular expression exactly for any Unicode text without being precomputed for all of Unicode. <br><br>
+    """
+
+    def __missing__(self, code_point):
+        value = None if PUNCTUATION_PATTERN.match(chr(code_point)) else code_point
+        self[code_point] = value
+        return value
+
+
+PUNCTUATION_TABLE = _PunctuationTable()
+
+
+def _batched(sentences: List[str], transform) -> List[str]:
+    """
+    Applies a string transformation to a whole batch of sentences at once
+    @param sentences: List of sentences
+    @param transform: Function from str to str that never adds, removes or changes the separator
+    @return: List of transformed sentences
+    """
+    if not sentences:
+        return []
+    joined = _SEPARATOR.join(sentences)
+    # A sentence containing the separator itself cannot be split back out, so fall back to one call per sentence
+    if joined.count(_SEPARATOR) != len(sentences) - 1:
+        return [transform(sentence) for sentence in sentences]
+    return transform(joined).split(_SEPARATOR)
+
+
+def lowercase(sentences: List[str]) -> List[str]:
+    """
+    Lowercases a batch of sentences, like str.lower on each one
+    @param sentences: List of sentences
+    @return: List of lowercased sentences
+    """
+    return _batched(sentences, str.lower)
+
+
+def strip_punctuation(sentences: List[str]) -> List[str]:
+    """
+    Removes punctuation from a batch of sentences, like re.sub(r'[^\\w\\s]', '', sentence) on each one
+    @param sentences: List of sentences
+    @return: List of sentences without punctuation
+    """
+    return _batched(sentences, lambda text: text.translate(PUNCTUATION_TABLE))
+
+
+def collapse_whitespace(sentences: List[str]) -> List[str]:
+    """
+    Collapses runs of whitespace in each sentence into single spaces and trims the ends
+    @param sentences: List of sentences
+    @return: List of sentences with collapsed whitespace
+    """
+    return [' '.join(sentence.split()) for sentence in sentences]
+
+
+def normalize(sentences: List[str], lower: bool = True, punctuation: bool = True,
+              whitespace: bool = False) -> List[str]:
+    """
+    Normalizes a batch of sentences <br><br>
+    @param sentences: List of sentences
+    @param lower: Lowercase the sentences (default: True)
+    @param punctuation: Remove punctuation (default: True)
+    @param whitespace: Collapse whitespace (default: False)
+    @return: List of normalized sentences
+    """
+    if lower and punctuation:
+        # Both steps keep the separator, so the batch is joined and split only once
+        sentences = _batched(sentences, lambda text: text.lower().translate(PUNCTUATION_TABLE))
+    elif lower:
+        sentences = lowercase(sentences)
+    elif punctuation:
+        sentences = strip_punctuation(sentences)
+    if whitespace:
+        sentences = collapse_whitespace(sentences)
+    return list(sentences)
+
+
+def normalize_series(series: pd.Series, lower: bool = True, punctuation: bool = True,
+                     whitespace: bool = False) -> pd.Series:
+    """
+    Normalizes a whole pandas column of text with pandas' string methods, matching normalize on its values <br><br>
+    The patterns are passed compiled so that they keep Python's Unicode meaning of \\w and \\s for every dtype, and
+    lowercasing maps str.lower over the values, as the Arrow string dtype's lower ignores final sigma.
+    @param series: Column of text
+    @param lower: Lowercase the text (default: True)
+    @param punctuation: Remove punctuation (default: True)
+    @param whitespace: Collapse whitespace (default: False)
+    @return: Normalized column
+    """
+    if lower:
+        series = series.map(str.lower, na_action='ignore')
+    if punctuation:
+        series = series.str.replace(PUNCTUATION_PATTERN, '', regex=True)
+    if whitespace:
+        series = series.str.replace(_WHITESPACE_PATTERN, ' ', regex=True).str.strip()
+    return series
@@ -5,19 +5,44 @@ __author__ = "Srihari Raman, Reema Sharma, Sriya Vuppala"
 
 # Imports
 # from graphviz import Digraph
+import time
+from src.metrics import STEP_ERRORS, STEP_SECONDS
+from src.planner import describe, plan_steps
 
 class Pipeline:
     """
     Class implementation of the PipelineParser <br><br>
     This class is used to construct a parser pipeline for the NLP framework <br><br>
     """
-    def __init__(self, steps):
+    def __init__(self, steps, optimize=False, reorder=False):
         """
         Constructor to take in a list of steps <br><br>
         @param steps: List of steps to be used in the pipeline (can take Input, Process, or Output functions)
+        @param optimize: Validate the steps and drop redundant ones before running (default: False)
+        @param reorder: When optimizing, also move dedup steps ahead of the others (default: False)
         """
         self.steps = steps
         self.results = {}
+        self.plan_notes = []
+        if optimize or reorder:
+            self.optimize(reorder)
+
+    def optimize(self, reorder=False):
+        """
+        Replaces the steps with a validated, cheaper plan (see planner.plan_steps) <br><br>
+        @param reorder: Also move dedup steps ahead of the others, which deduplicates processed_text earlier
+        @return: Notes describing each rewrite
+        """
+        self.steps, self.plan_notes = plan_steps(self.steps, reorder)
+        return self.plan_notes
+
+    def explain(self):
+        """
+        Describes the steps that will run and the rewrites made by optimize <br><br>
+        @return: Multi-line plan report
+        """
+        lines = [f"{position + 1}. {name}: {describe(step)}" for position, (name, step) in enumerate(self.steps)]
+        return '\n'.join(lines + [f"- {note}" for note in self.plan_notes])
 
     # TODO: To be implemented
     def execute(self, file_name, file_path, **kwargs):
@@ -33,10 +58,94 @@ class Pipeline:
         result_dict = {}
 
         for process_name, func in self.steps:
-            result_dict = func.run(result_dict=result_dict, file_name=file_name, kwargs=kwargs)
+            result_dict = self._run_step(process_name, func, result_dict, file_name, kwargs)
 
         return result_dict
 
+    @staticmethod
+    def _run_step(name, func, result_dict, file_name, kwargs):
+        """
+        Runs one step, recording its latency and any error in the metrics registry (see metrics.py)
+        @param name: Name of the step
+        @param func: Step object
+        @param result_dict: Result dictionary passed to the step
+        @param file_name: Name of file
+        @param kwargs: Keyword arguments passed to the step
+        @return: Result dictionary returned by the step
+        """
+        start = time.perf_counter()
+        try:
+            return func.run(result_dict=result_dict, file_name=file_name, kwargs=kwargs)
+        except Exception:
+            STEP_ERRORS.inc(step=name)
+            raise
+        finally:
+            STEP_SECONDS.observe(time.perf_counter() - start, step=name)
+
+    def execute_batch(self, documents, **kwargs):
+        """
+        Executes each step in the pipeline on a batch of files <br><br>
+        Runs of consecutive elementwise steps (see Process.is_elementwise) process the sentences of every file in the
+        batch in one call; every other step runs file by file. The results are the same as calling execute on each
+        file. <br><br>
+        @param documents: List of (file_name, file_path, kwargs) tuples; each file's kwargs extend the shared ones
+        @param kwargs: Shared keyword arguments, passed as kwargs=... like in execute
+        @return: List of result dictionaries, in the order of documents
+        """
+        shared_kwargs = kwargs.get('kwargs', {})
+        doc_kwargs = []
+        for _, file_path, extra_kwargs in documents:
+            merged = {key: value for key, value in dict(shared_kwargs, **extra_kwargs).items() if value is not None}
+            merged['filepath'] = file_path
+            doc_kwargs.append(merged)
+
+        # Create a new result_dict for each file
+        result_dicts = [{} for _ in documents]
+
+        i = 0
+        while i < len(self.steps):
+            end = i
+            while end < len(self.steps) and getattr(self.steps[end][1], 'is_elementwise', False):
+                end += 1
+
+            if end > i:
+                self._execute_elementwise(self.steps[i:end], documents, result_dicts, shared_kwargs)
+                i = end
+                continue
+
+            name, func = self.steps[i]
+            for k, (file_name, _, _) in enumerate(documents):
+                result_dicts[k] = self._run_step(name, func, result_dicts[k], file_name, doc_kwargs[k])
+            i += 1
+
+        return result_dicts
+
+    @staticmethod
+    def _execute_elementwise(steps, documents, result_dicts, kwargs):
+        """
+        Runs elementwise steps once over the concatenated processed text of a batch of files <br><br>
+        @param steps: Elementwise steps to run, in order
+        @param documents: List of (file_name, file_path, kwargs) tuples of the batch
+        @param result_dicts: Result dictionaries of the batch, updated in place
+        @param kwargs: Keyword arguments passed to the steps
+        @return: None
+        """
+        texts = [result_dict[file_name]["processed_text"]
+                 for (file_name, _, _), result_dict in zip(documents, result_dicts)]
+        batch_name = "__batch__"
+        batch_dict = {batch_name: {"processed_text": [sentence for text in texts for sentence in text]}}
+
+        for name, func in steps:
+            batch_dict = Pipeline._run_step(name, func, batch_dict, batch_name, kwargs)
+
+        # Write the processed sentences back into each file's own list, as the steps do when run file by file
+        processed_text = batch_dict[batch_name]["processed_text"]
+        start = 0
+        for text, result_dict in zip(texts, result_dicts):
+            text[:] = processed_text[start:start + len(text)]
+            result_dict["processed_text"] = text
+            start += len(text)
+
     def add_to_pipeline(self, step):
         """
         Adds a step to the pipeline
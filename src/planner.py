@@ -0,0 +1,154 @@
+"""
+Planning phase for pipelines
+planner.py: Validates, simplifies and optionally reorders the steps of a Pipeline
+"""
+__author__ = "Srihari Raman, Sriya Vuppala"
+
+# Imports
+from typing import List, Tuple
+
+from src.exceptions.pipeline_exceptions import InvalidPipelineError
+
+# Attribute holding the type of each kind of step
+TYPE_ATTRIBUTES = {'load': 'file_type', 'process': 'process_type', 'analyze': 'analyze_type'}
+
+# Process types for which running twice in a row gives the same text as running once
+IDEMPOTENT_PROCESS_TYPES = {'stop_words', 'punctuation', 'capitalization', 'dedup'}
+
+# Process types whose output is already lowercase, making a capitalization step right after them a no-op
+LOWERCASING_PROCESS_TYPES = {'stem'}
+
+# Analyze types that also store '_ci', '_se' and '_sample_size' keys when run in approximate mode
+SAMPLED_ANALYZE_TYPES = {'word_count', 'polarity_score', 'subjectivity_score'}
+
+
+def step_kind(step) -> str:
+    """
+    Classifies a pipeline step by the kind of class it is
+    @param step: Step object
+    @return: 'load', 'process', 'analyze' or 'other'
+    """
+    if hasattr(step, 'file_type'):
+        return 'load'
+    if hasattr(step, 'process_type'):
+        return 'process'
+    if hasattr(step, 'analyze_type'):
+        return 'analyze'
+    return 'other'
+
+
+def describe(step) -> str:
+    """
+    Describes a step for plan reports
+    @param step: Step object
+    @return: Description such as "Process('stem')"
+    """
+    kind = step_kind(step)
+    if kind == 'other':
+        return type(step).__name__
+    return f"{type(step).__name__}('{getattr(step, TYPE_ATTRIBUTES[kind])}')"
+
+
+def _writes_estimate_keys(step) -> bool:
+    """
+    Whether an Analyze step stores confidence interval keys next to its result
+    @param step: Analyze step
+    @return: True for approximate word_count, polarity_score and subjectivity_score steps
+    """
+    return getattr(step, 'approximate', False) and step.analyze_type in SAMPLED_ANALYZE_TYPES
+
+
+def _overwrites(later, step) -> bool:
+    """
+    Whether a later Analyze step overwrites every result key of an earlier one
+    @param later: Later Analyze step
+    @param step: Earlier Analyze step
+    @return: True if the earlier step's results are all replaced
+    """
+    return (later.analyze_type == step.analyze_type and
+            (not _writes_estimate_keys(step) or _writes_estimate_keys(later)))
+
+
+def validate_steps(steps):
+    """
+    Checks that the steps form a runnable pipeline
+    @param steps: List of (name, step) tuples
+    @return: None
+    @raise InvalidPipelineError: If a step is malformed, of an unknown type, or runs before any Load step
+    """
+    loaded = False
+    for position, entry in enumerate(steps):
+        if not isinstance(entry, tuple) or len(entry) != 2 or not hasattr(entry[1], 'run'):
+            raise InvalidPipelineError(f"step {position} must be a (name, step) tuple whose step has a run method")
+
+        name, step = entry
+        kind = step_kind(step)
+        if kind == 'load':
+            loaded = True
+        elif not loaded:
+            raise InvalidPipelineError(f"step {position} ({name}) runs before any Load step")
+
+        step_type = getattr(step, TYPE_ATTRIBUTES.get(kind, ''), None)
+        if kind != 'other' and step_type not in step.map:
+            raise InvalidPipelineError(f"step {position} ({name}) has unsupported type {step_type}")
+
+
+def plan_steps(steps, reorder: bool = False) -> Tuple[list, List[str]]:
+    """
+    Validates the steps and rewrites them into a cheaper plan <br><br>
+    The default rewrites never change any result: <br>
+    - an idempotent Process step (stop_words, punctuation, capitalization, dedup) that repeats the last text-changing
+      step is dropped <br>
+    - a capitalization step right after stem is dropped, since stemming already lowercases <br>
+    - an Analyze step whose result keys are all overwritten by a later Analyze step of the same type is dropped; an
+      approximate step is kept before an exact one, whose result leaves its '_ci', '_se' and '_sample_size' keys <br>
+    With reorder=True, dedup steps also move up to right after the Load steps so that everything else runs on unique
+    sentences only. Analysis results stay the same up to floating point rounding, but processed_text is then
+    deduplicated before rather than after the other Process steps. <br><br>
+    @param steps: List of (name, step) tuples
+    @param reorder: Allow moving dedup steps ahead of the other steps (default: False)
+    @return: Tuple of (planned steps, notes describing each rewrite)
+    """
+    validate_steps(steps)
+    notes = []
+    planned = list(steps)
+
+    if reorder:
+        loads = [entry for entry in planned if step_kind(entry[1]) == 'load']
+        dedups = [entry for entry in planned
+                  if step_kind(entry[1]) == 'process' and entry[1].process_type == 'dedup']
+        rest = [entry for entry in planned if entry not in loads and entry not in dedups]
+        reordered = loads + dedups + rest
+        if reordered != planned:
+            notes.append(f"moved {', '.join(name for name, _ in dedups)} ahead of the other steps")
+        planned = reordered
+
+    # Drop redundant Process steps; Analyze steps only read the text, so they do not separate two Process steps
+    simplified = []
+    last_process = None
+    for name, step in planned:
+        kind = step_kind(step)
+        if kind == 'process':
+            process_type = step.process_type
+            if last_process is not None:
+                if process_type == last_process and process_type in IDEMPOTENT_PROCESS_TYPES:
+                    notes.append(f"dropped {name}: {describe(step)} repeats the previous step")
+                    continue
+                if process_type == 'capitalization' and last_process in LOWERCASING_PROCESS_TYPES:
+                    notes.append(f"dropped {name}: text is already lowercase after {last_process}")
+                    continue
+            last_process = process_type
+        elif kind != 'analyze':
+            last_process = None
+        simplified.append((name, step))
+
+    # Drop Analyze steps whose result key is overwritten later
+    final = []
+    for position, (name, step) in enumerate(simplified):
+        if step_kind(step) == 'analyze' and any(step_kind(later) == 'analyze' and _overwrites(later, step)
+                                                for _, later in simplified[position + 1:]):
+            notes.append(f"dropped {name}: {describe(step)} is overwritten by a later step")
+            continue
+        final.append((name, step))
+
+    return final, notes
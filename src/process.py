@@ -9,9 +9,11 @@ import nltk
 from nltk.stem import WordNetLemmatizer
 from nltk.stem import PorterStemmer
 from nltk.tokenize import word_tokenize
-import re
+import hashlib
 from typing import Dict, Any
 from src.exceptions.process_exceptions import UnsupportedProcessTypeError
+from src.normalize import lowercase, strip_punctuation
+from src.metrics import CACHE_HITS, CACHE_MISSES, SENTENCES
 
 
 class Process:
@@ -19,18 +21,38 @@ class Process:
     Class implementation of the Processing part of the pipeline <br><br>
     This class is used to process files using the NLP framework <br><br>
     """
+    # Process types that transform every sentence independently of the others
+    ELEMENTWISE_TYPES = {'stop_words', 'punctuation', 'lemmatize', 'lemmatize_pos', 'stem', 'capitalization'}
+
+    # First letter of a Penn Treebank tag -> WordNet part of speech; every other tag is lemmatized as a noun
+    WORDNET_POS = {'J': 'a', 'V': 'v', 'N': 'n', 'R': 'r'}
 
     def __init__(self, process_type: str):
         nltk.download('wordnet')
+        if process_type == 'lemmatize_pos':
+            nltk.download('averaged_perceptron_tagger_eng')
         self.process_type = process_type
         self.map = {
             'stop_words': self.filter_stopwords,
             'punctuation': self.filter_punctuation,
             'lemmatize': self.lemmatize,
+            'lemmatize_pos': self.lemmatize_pos,
             'stem': self.stem,
-            'capitalization': self.remove_capitalization
+            'capitalization': self.remove_capitalization,
+            'dedup': self.deduplicate
         }
         self.stop_words = self.load_stopwords()
+        # Lemmas already looked up by lemmatize_pos, keyed by (token, WordNet POS)
+        self.lemma_cache = {}
+        self.lemma_hits = 0
+        self.lemma_misses = 0
+
+    @property
+    def is_elementwise(self):
+        """
+        Whether the process transforms each sentence on its own, so that it can run over several files at once
+        """
+        return self.process_type in self.ELEMENTWISE_TYPES
 
     def run(self, result_dict: Dict[str, Any], file_name, **kwargs: Dict[str, Any]):
         """
@@ -40,6 +62,7 @@ class Process:
         @param kwargs (Dict[str, Any]): OPTIONAL Keyword arguments to aid in the processing of functions
         @return: Updated result_dict with new results
         """
+        hits, misses = self.lemma_hits, self.lemma_misses
         try:
             result_dict = self.map[self.process_type](result_dict, file_name, **kwargs)
         except KeyError:
@@ -47,6 +70,10 @@ class Process:
         except Exception as e:
             raise e
 
+        SENTENCES.inc(len(result_dict["processed_text"]), stage='process', type=self.process_type)
+        if self.lemma_hits != hits or self.lemma_misses != misses:
+            CACHE_HITS.inc(self.lemma_hits - hits, cache='lemma')
+            CACHE_MISSES.inc(self.lemma_misses - misses, cache='lemma')
         return result_dict
 
     def filter_stopwords(self, result_dict, file_name, **kwargs: Dict[str, Any]):
@@ -95,9 +122,8 @@ class Process:
         """
         processed_text = result_dict[file_name]["processed_text"]
 
-        for i in range(len(processed_text)):
-            # Removing punctuation
-            processed_text[i] = re.sub('[^\w\s]', '', processed_text[i])
+        # Removing punctuation from all sentences at once
+        processed_text[:] = strip_punctuation(processed_text)
         # Adding processed text to result dictionary
         result_dict["processed_text"] = processed_text
         return result_dict
@@ -124,6 +150,40 @@ class Process:
         result_dict["processed_text"] = processed_text
         return result_dict
 
+    def lemmatize_pos(self, result_dict, file_name, **kwargs: Dict[str, Any]):
+        """
+        Lemmatizes words in the loaded list of sentences using their part of speech <br><br>
+        Each sentence is tagged with NLTK's perceptron tagger and each tag is mapped to its WordNet part of speech, so
+        that e.g. 'running' (verb) becomes 'run'. Lemmas are cached per (token, part of speech) across runs, but the
+        tagging is an extra pass over every token (pos_tag_sents still tags one sentence at a time), so this step is
+        slower than lemmatize and should be chosen for its accuracy, not its speed.
+        @param result_dict: Result dictionary to update with process results
+        @param kwargs (Dict[str, Any]): OPTIONAL Keyword arguments to aid in the processing of functions
+        @return: Updated result_dict with new results
+        """
+        processed_text = result_dict[file_name]["processed_text"]
+        lem = WordNetLemmatizer()
+        cache = self.lemma_cache
+
+        # Tag the tokenized sentences with a single tagger instance
+        tagged_sentences = nltk.pos_tag_sents([word_tokenize(sentence) for sentence in processed_text])
+        for i, tagged_words in enumerate(tagged_sentences):
+            lem_words = []
+            for word, tag in tagged_words:
+                key = (word, self.WORDNET_POS.get(tag[:1], 'n'))
+                lemma = cache.get(key)
+                if lemma is None:
+                    self.lemma_misses += 1
+                    lemma = cache[key] = lem.lemmatize(*key)
+                else:
+                    self.lemma_hits += 1
+                lem_words.append(lemma)
+            # Update the sentence to the lemmatized version
+            processed_text[i] = ' '.join(lem_words)
+        # Adding processed text to result dictionary
+        result_dict["processed_text"] = processed_text
+        return result_dict
+
     def stem(self, result_dict, file_name, **kwargs: Dict[str, Any]):
         """
         stems words in the loaded list of sentences
@@ -145,6 +205,39 @@ class Process:
         result_dict["processed_text"] = processed_text
         return result_dict
 
+    def deduplicate(self, result_dict, file_name, **kwargs: Dict[str, Any]):
+        """
+        Collapses duplicate sentences in the loaded list of sentences <br><br>
+        Sentences are compared by a hash of their whitespace-normalized text and the first occurrence is kept. The number
+        of copies of each kept sentence is stored under 'sentence_multiplicity' so that Analyze steps weight their
+        results as if every copy were still present.
+        @param result_dict: Result dictionary to update with process results
+        @param kwargs (Dict[str, Any]): OPTIONAL Keyword arguments to aid in the processing of functions
+        @return: Updated result_dict with new results
+        """
+        processed_text = result_dict[file_name]["processed_text"]
+        # Running dedup on already deduplicated text has to carry the earlier counts forward
+        multiplicity = result_dict.get("sentence_multiplicity", [1] * len(processed_text))
+
+        positions = {}
+        unique_text = []
+        unique_multiplicity = []
+        for sentence, count in zip(processed_text, multiplicity):
+            # Whitespace does not change any analysis result, so it is ignored when comparing sentences
+            key = hashlib.blake2b(' '.join(sentence.split()).encode('utf-8'), digest_size=16).digest()
+            if key in positions:
+                unique_multiplicity[positions[key]] += count
+            else:
+                positions[key] = len(unique_text)
+                unique_text.append(sentence)
+                unique_multiplicity.append(count)
+
+        # Adding processed text to result dictionary
+        result_dict[file_name]["processed_text"] = unique_text
+        result_dict["processed_text"] = unique_text
+        result_dict["sentence_multiplicity"] = unique_multiplicity
+        return result_dict
+
     def remove_capitalization(self, result_dict, file_name, **kwargs: Dict[str, Any]):
         """
         Removes capitalization from the loaded list of sentences
@@ -154,9 +247,8 @@ class Process:
         """
         processed_text = result_dict[file_name]["processed_text"]
 
-        for i in range(len(processed_text)):
-            # Converting the sentence to lowercase
-            processed_text[i] = processed_text[i].lower()
+        # Converting all sentences to lowercase at once
+        processed_text[:] = lowercase(processed_text)
         # Adding processed text to result dictionary
         result_dict["processed_text"] = processed_text
         return result_dict
@@ -0,0 +1,225 @@
+"""
+Memory-budgeted streaming execution of a pipeline
+scheduler.py: Implementation of MemoryBudget and StageScheduler
+"""
+__author__ = "Srihari Raman"
+
+# Imports
+import queue
+import sys
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from src.aggregate import ResultAggregate
+from src.pipeline import Pipeline
+
+# How often blocked stages wake up to check whether the run has been stopped
+_POLL_SECONDS = 0.1
+
+
+class MemoryBudget:
+    """
+    Class implementation of a global memory budget shared by the stages of a StageScheduler <br><br>
+    Loaders acquire the estimated size of every batch before handing it downstream and the last stage releases it
+    once the batch has been merged, so loaders block (backpressure) whenever downstream stages fall behind. <br><br>
+    """
+
+    def __init__(self, limit: int):
+        """
+        Constructor to take in the budget <br><br>
+        @param limit: Maximum number of bytes of sentence batches in flight
+        """
+        self.limit = limit
+        self.used = 0
+        self.peak = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, size: int, stop: threading.Event = None) -> bool:
+        """
+        Blocks until size bytes fit in the budget <br><br>
+        A batch larger than the whole budget is let through once nothing else is in flight, so that it cannot
+        deadlock the run. <br><br>
+        @param size: Number of bytes to acquire
+        @param stop: OPTIONAL event that aborts the wait when set
+        @return: True once acquired, False if stop was set first
+        """
+        with self._condition:
+            while self.used > 0 and self.used + size > self.limit:
+                if stop is not None and stop.is_set():
+                    return False
+                self._condition.wait(_POLL_SECONDS)
+            self.used += size
+            self.peak = max(self.peak, self.used)
+            return True
+
+    def release(self, size: int):
+        """
+        Returns size bytes to the budget
+        @param size: Number of bytes to release
+        @return: None
+        """
+        with self._condition:
+            self.used -= size
+            self._condition.notify_all()
+
+
+def batch_size_of(sentences: List[str]) -> int:
+    """
+    Estimates the memory held by a batch of sentences
+    @param sentences: Batch of sentences
+    @return: Estimated size in bytes
+    """
+    return sys.getsizeof(sentences) + sum(sys.getsizeof(sentence) for sentence in sentences)
+
+
+class StageScheduler:
+    """
+    Class implementation of a streaming pipeline scheduler <br><br>
+    Runs a pipeline as three connected stages, each in its own thread: the Load step streams batches of sentences
+    (see Load.iter_batches), the following steps process each batch, and the trailing Analyze steps analyze each batch,
+    whose results are merged per file with a ResultAggregate. Stages are connected by bounded queues and every batch
+    in flight is charged to a MemoryBudget, so peak memory stays predictable however large the files are. <br><br>
+    Results hold the merged Analyze results and a 'sentence_count' but no text, since the point is to never hold a
+    whole file. The batches hold the same sentences as a whole-file Load (see Load.iter_batches), so averages merged
+    from per-batch averages differ from a whole-file run only by rounding. <br><br>
+    """
+
+    def __init__(self, pipeline, memory_budget: int = 256 * 1024 * 1024, batch_size: int = 1000,
+                 queue_size: int = 4):
+        """
+        Constructor to take in the pipeline and limits <br><br>
+        @param pipeline: Pipeline whose first step is a Load step
+        @param memory_budget: Maximum bytes of sentence batches in flight (default: 256 MiB)
+        @param batch_size: Number of sentences per batch (default: 1000)
+        @param queue_size: Maximum number of batches waiting between two stages (default: 4)
+        @raise ValueError: If the pipeline does not start with a Load step, or has a step other than a Process step
+        between it and the trailing Analyze steps
+        """
+        self.pipeline = pipeline
+        self.budget = MemoryBudget(memory_budget)
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+
+        steps = list(pipeline.steps)
+        if not steps or not hasattr(steps[0][1], "iter_batches"):
+            raise ValueError("StageScheduler needs a pipeline whose first step is a Load step")
+
+        # Trailing Analyze steps form the analyze stage; everything between them and the Load step is processing
+        split = len(steps)
+        while split > 1 and hasattr(steps[split - 1][1], "analyze_type"):
+            split -= 1
+        # Process steps work on each batch alone; any other step (e.g. an Index) would only see the file's last batch
+        for name, step in steps[1:split]:
+            if not hasattr(step, "process_type"):
+                raise ValueError(f"StageScheduler can only run Process steps between the Load and Analyze steps, "
+                                 f"not '{name}'")
+        self.load_step = steps[0][1]
+        self.process_steps = steps[1:split]
+        self.analyze_steps = steps[split:]
+
+    def run(self, files: Iterable[Tuple[str, str, Dict[str, Any]]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Streams files through the stages <br><br>
+        @param files: Iterable of (file_name, file_path, kwargs) like the ones NLPAnalyzer passes to Pipeline.execute
+        @return: Iterator of (file_name, result) in file order, each yielded as soon as the file is finished
+        """
+        stop = threading.Event()
+        errors = []
+        processed = queue.Queue(self.queue_size)
+        loaded = queue.Queue(self.queue_size)
+        finished = queue.Queue()
+
+        def put(target, item):
+            while not stop.is_set():
+                try:
+                    target.put(item, timeout=_POLL_SECONDS)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def get(source):
+            while not stop.is_set():
+                try:
+                    return source.get(timeout=_POLL_SECONDS)
+                except queue.Empty:
+                    continue
+            return None
+
+        def guarded(stage):
+            def target():
+                try:
+                    stage()
+                except Exception as e:
+                    errors.append(e)
+                    stop.set()
+                    finished.put(None)
+            return target
+
+        def load_stage():
+            for file_name, file_path, kwargs in files:
+                file_kwargs = dict(kwargs, filepath=file_path)
+                for sentences in self.load_step.iter_batches(file_name, self.batch_size, kwargs=file_kwargs):
+                    size = batch_size_of(sentences)
+                    if not self.budget.acquire(size, stop):
+                        return
+                    if not put(loaded, (file_name, file_kwargs, sentences, size)):
+                        return
+                if not put(loaded, (file_name, file_kwargs, None, 0)):
+                    return
+            put(loaded, None)
+
+        def process_stage():
+            while True:
+                item = get(loaded)
+                if item is None:
+                    put(processed, None)
+                    return
+                file_name, file_kwargs, sentences, size = item
+                result_dict = None
+                if sentences is not None:
+                    result_dict = {file_name: {"raw_text": sentences, "processed_text": sentences},
+                                   "processed_text": sentences}
+                    for name, func in self.process_steps:
+                        result_dict = Pipeline._run_step(name, func, result_dict, file_name, file_kwargs)
+                if not put(processed, (file_name, file_kwargs, result_dict, size)):
+                    return
+
+        def analyze_stage():
+            aggregates = {}
+            while True:
+                item = get(processed)
+                if item is None:
+                    finished.put(None)
+                    return
+                file_name, file_kwargs, result_dict, size = item
+                aggregate = aggregates.setdefault(file_name, ResultAggregate())
+                if result_dict is None:
+                    finished.put((file_name, aggregates.pop(file_name).to_dict()))
+                    continue
+                for name, func in self.analyze_steps:
+                    result_dict = Pipeline._run_step(name, func, result_dict, file_name, file_kwargs)
+                aggregate.add(result_dict)
+                # The batch's sentences are no longer referenced once its results are merged
+                del result_dict
+                self.budget.release(size)
+
+        threads = [threading.Thread(target=guarded(stage), name=f"linguisight-{stage.__name__}", daemon=True)
+                   for stage in (load_stage, process_stage, analyze_stage)]
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                item = finished.get()
+                if item is None:
+                    break
+                yield item
+        finally:
+            # Also stops the stages when the caller abandons the iterator early
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        if errors:
+            raise errors[0]
@@ -0,0 +1,229 @@
+"""
+Long-lived analysis server for the NLP framework
+server.py: Implementation of MicroBatcher and AnalysisServer
+"""
+__author__ = "Srihari Raman"
+
+# Imports
+import json
+import os
+import queue
+import socketserver
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict
+
+
+class MicroBatcher:
+    """
+    Class implementation of a request micro-batcher <br><br>
+    Collects documents submitted from many threads and runs them through the pipeline together, so that elementwise
+    Process steps handle a whole batch per call. A batch is started once max_batch_size documents are waiting or the
+    oldest one has waited max_wait seconds. <br><br>
+    """
+
+    def __init__(self, pipeline, max_batch_size: int = 32, max_wait: float = 0.005, **kwargs):
+        """
+        Constructor to take in the pipeline and batching limits <br><br>
+        @param pipeline: Pipeline whose first step loads 'str' documents
+        @param max_batch_size: Maximum number of documents per batch (default: 32)
+        @param max_wait: Maximum seconds a document waits for its batch to fill up (default: 0.005)
+        @param kwargs: OPTIONAL Keyword arguments passed to every pipeline step
+        """
+        self.pipeline = pipeline
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self.kwargs = kwargs
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._loop, name="linguisight-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, file_name: str, file_text: str) -> Future:
+        """
+        Queues a document for analysis <br><br>
+        @param file_name: Name of the document
+        @param file_text: Text of the document
+        @return: Future resolving to the document's result dictionary
+        """
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+
+        future = Future()
+        self._queue.put((file_name, file_text, future))
+        return future
+
+    def _next_batch(self):
+        """
+        Blocks until a document arrives, then gathers more until the batch is full or the wait is over
+        """
+        first = self._queue.get()
+        if first is None:
+            return None
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Put the sentinel back so the loop stops after this batch
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _loop(self):
+        """
+        Runs batches until the batcher is closed
+        """
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            documents = [(file_name, None, {"file_text": file_text}) for file_name, file_text, _ in batch]
+            try:
+                results = self.pipeline.execute_batch(documents, kwargs=self.kwargs)
+            except Exception:
+                # Run the documents one by one so that a single bad document only fails its own request
+                results = None
+
+            for k, (file_name, file_text, future) in enumerate(batch):
+                if results is not None:
+                    future.set_result(results[k])
+                    continue
+                try:
+                    future.set_result(self.pipeline.execute(file_name, None,
+                                                            kwargs=dict(self.kwargs, file_text=file_text)))
+                except Exception as e:
+                    future.set_exception(e)
+
+    def close(self):
+        """
+        Finishes the queued documents and stops the batching thread
+        @return: None
+        """
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP handler for the analysis server <br><br>
+    GET /health answers 'ok'; POST /analyze takes {"text": ..., "name": ...} and answers with the result dictionary.
+    """
+
+    def log_message(self, format, *args):
+        # Keep the server quiet; Unix socket clients have no address to log anyway
+        pass
+
+    def _respond(self, status: int, body: Dict[str, Any]):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._respond(200, {"status": "ok"})
+        else:
+            self._respond(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/analyze":
+            self._respond(404, {"error": f"Unknown path {self.path}"})
+            return
+
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            file_text = request["text"]
+            file_name = request.get("name", "document")
+        except (ValueError, KeyError, TypeError):
+            self._respond(400, {"error": 'Expected a JSON body like {"text": "...", "name": "..."}'})
+            return
+
+        try:
+            result = self.server.batcher.submit(file_name, file_text).result()
+        except Exception as e:
+            self._respond(500, {"error": str(e)})
+            return
+
+        self._respond(200, result)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Threaded HTTP server listening on a Unix socket
+    """
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # BaseHTTPRequestHandler expects a (host, port) client address
+        return request, ("unix", 0)
+
+
+class AnalysisServer:
+    """
+    Class implementation of a long-lived analysis server <br><br>
+    Keeps a pipeline and its models warm in one process and serves 'str' documents over local HTTP, either on a TCP
+    port or on a Unix socket. Concurrent requests are grouped into micro-batches by a MicroBatcher. <br><br>
+    """
+
+    def __init__(self, pipeline, host: str = "127.0.0.1", port: int = 8000, unix_socket: str = None,
+                 max_batch_size: int = 32, max_wait: float = 0.005, **kwargs):
+        """
+        Constructor to take in the pipeline and where to listen <br><br>
+        @param pipeline: Pipeline whose first step loads 'str' documents, e.g. Load('str')
+        @param host: Host to listen on (default: 127.0.0.1)
+        @param port: TCP port to listen on, 0 for any free port (default: 8000)
+        @param unix_socket: OPTIONAL path of a Unix socket to listen on instead of TCP
+        @param max_batch_size: Maximum number of documents per batch (default: 32)
+        @param max_wait: Maximum seconds a document waits for its batch to fill up (default: 0.005)
+        @param kwargs: OPTIONAL Keyword arguments passed to every pipeline step
+        """
+        self.batcher = MicroBatcher(pipeline, max_batch_size=max_batch_size, max_wait=max_wait, **kwargs)
+
+        if unix_socket is not None:
+            if os.path.exists(unix_socket):
+                os.remove(unix_socket)
+            self.httpd = _UnixHTTPServer(unix_socket, _RequestHandler)
+        else:
+            self.httpd = ThreadingHTTPServer((host, port), _RequestHandler)
+            self.httpd.daemon_threads = True
+        self.httpd.batcher = self.batcher
+
+    @property
+    def server_address(self):
+        """
+        The (host, port) tuple or Unix socket path the server listens on
+        """
+        return self.httpd.server_address
+
+    def serve_forever(self):
+        """
+        Serves requests until shutdown is called from another thread
+        @return: None
+        """
+        self.httpd.serve_forever()
+
+    def shutdown(self):
+        """
+        Stops serving, finishes the queued documents and releases the socket
+        @return: None
+        """
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.batcher.close()
+        if isinstance(self.httpd, _UnixHTTPServer) and os.path.exists(self.httpd.server_address):
+            os.remove(self.httpd.server_address)
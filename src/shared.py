@@ -0,0 +1,267 @@
+"""
+Shared-memory transfer of pipeline results from worker processes
+shared.py: Implementation of share_result and SharedResult
+"""
+__author__ = "Srihari Raman"
+
+# Imports
+import weakref
+from collections import Counter
+from collections.abc import Mapping, Sequence
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict
+import numpy as np
+
+# Pipeline of the current worker process, set once by init_worker
+_worker_pipeline = None
+
+
+class _Layout:
+    """
+    Accumulates the byte chunks of one shared-memory segment, keeping every chunk 8-byte aligned
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def add(self, data: bytes) -> int:
+        offset = self.size
+        padding = -len(data) % 8
+        self.chunks.append(data + b'\0' * padding)
+        self.size += len(data) + padding
+        return offset
+
+
+def _pack_strings(layout: _Layout, strings) -> Dict[str, int]:
+    """
+    Packs strings as one UTF-8 blob plus an int64 array of the n + 1 offsets delimiting them
+    """
+    encoded = [string.encode('utf-8') for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(data) for data in encoded], out=offsets[1:])
+    return {"offsets": layout.add(offsets.tobytes()), "count": len(encoded), "blob": layout.add(b''.join(encoded))}
+
+
+def _pack(layout: _Layout, value, packed: Dict[int, Any]):
+    """
+    Describes a result value, moving sentence lists and word counts into the layout
+    """
+    # Values stored under several keys (raw_text and processed_text often are one list) are packed once
+    if id(value) in packed:
+        return packed[id(value)]
+
+    if isinstance(value, Counter) and all(isinstance(word, str) for word in value):
+        description = dict(_pack_strings(layout, value.keys()), kind="counter",
+                           counts=layout.add(np.fromiter(value.values(), dtype=np.int64, count=len(value)).tobytes()))
+    elif isinstance(value, list) and all(isinstance(sentence, str) for sentence in value):
+        description = dict(_pack_strings(layout, value), kind="sentences")
+    elif isinstance(value, dict) and not isinstance(value, Counter):
+        description = {"kind": "dict", "items": {key: _pack(layout, item, packed) for key, item in value.items()}}
+    else:
+        description = {"kind": "value", "value": value}
+
+    packed[id(value)] = description
+    return description
+
+
+def share_result(result_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Moves the sentence lists and word counts of a result dictionary into one shared-memory segment <br><br>
+    The returned handle is small and cheap to pickle; SharedResult attaches to the segment in another process.
+    The segment is left for that process to unlink. <br><br>
+    @param result_dict: Result dictionary produced by Pipeline.execute
+    @return: Handle describing the segment and the layout of the result
+    """
+    layout = _Layout()
+    root = _pack(layout, result_dict, {})
+
+    shm = shared_memory.SharedMemory(create=True, size=max(layout.size, 1))
+    shm.buf[:layout.size] = b''.join(layout.chunks)
+    # The attaching process owns the segment from now on, so this process must not clean it up on exit
+    try:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    shm.close()
+
+    return {"name": shm.name, "root": root}
+
+
+def discard_shared(handle: Dict[str, Any]):
+    """
+    Unlinks the segment of a handle returned by share_result that will never be attached
+    @param handle: Handle returned by share_result
+    @return: None
+    """
+    try:
+        shm = shared_memory.SharedMemory(name=handle["name"])
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+class _Segment:
+    """
+    Owns an attached shared-memory segment and unlinks it once nothing refers to it anymore
+    """
+
+    def __init__(self, name: str):
+        self.shm = shared_memory.SharedMemory(name=name)
+        self.buf = self.shm.buf
+        self.views = []
+        weakref.finalize(self, _release, self.shm, self.views)
+
+    def int64s(self, offset: int, count: int) -> memoryview:
+        view = self.buf[offset:offset + 8 * count].cast('q')
+        self.views.append(view)
+        return view
+
+
+def _release(shm, views):
+    """
+    Releases the views into a segment, then closes and unlinks it
+    """
+    for view in views:
+        view.release()
+    shm.close()
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+
+class SharedSentences(Sequence):
+    """
+    Class implementation of a read-only list of strings stored in shared memory <br><br>
+    Strings are decoded from the segment when they are accessed; nothing is copied when attaching. <br><br>
+    """
+
+    def __init__(self, segment: _Segment, description: Dict[str, Any]):
+        self._segment = segment
+        self._count = description["count"]
+        self._offsets = segment.int64s(description["offsets"], self._count + 1)
+        self._blob = description["blob"]
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("SharedSentences index out of range")
+        return str(self._segment.buf[self._blob + self._offsets[i]:self._blob + self._offsets[i + 1]], 'utf-8')
+
+    def __eq__(self, other):
+        if isinstance(other, Sequence) and not isinstance(other, str):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self):
+        return f"SharedSentences({list(self)!r})"
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+
+class SharedResult(Mapping):
+    """
+    Class implementation of a pipeline result dictionary backed by shared memory <br><br>
+    Behaves like the dictionary returned by Pipeline.execute: sentence lists are SharedSentences views and word
+    counts are decoded into a Counter the first time they are accessed. The segment is unlinked once the result and
+    every view taken from it have been garbage collected. Pickling a SharedResult produces a plain dictionary. <br><br>
+    """
+
+    def __init__(self, handle: Dict[str, Any], segment: _Segment = None, shared_values: Dict[int, Any] = None):
+        """
+        Constructor to attach to the segment of a handle returned by share_result <br><br>
+        @param handle: Handle returned by share_result
+        @param segment: Segment already attached (used for nested dictionaries)
+        @param shared_values: Values decoded so far, by description (used for nested dictionaries)
+        """
+        self._segment = segment if segment is not None else _Segment(handle["name"])
+        self._items = handle["root"]["items"]
+        self._decoded = {}
+        self._shared_values = shared_values if shared_values is not None else {}
+
+    def __getitem__(self, key):
+        if key not in self._decoded:
+            self._decoded[key] = self._decode(self._items[key])
+        return self._decoded[key]
+
+    def _decode(self, description: Dict[str, Any]):
+        # Values that were stored under several keys decode to one shared object, as in the original result
+        cache_key = id(description)
+        if cache_key in self._shared_values:
+            return self._shared_values[cache_key]
+
+        kind = description["kind"]
+        if kind == "sentences":
+            value = SharedSentences(self._segment, description)
+        elif kind == "counter":
+            words = SharedSentences(self._segment, description)
+            counts = self._segment.int64s(description["counts"], len(words))
+            value = Counter(dict(zip(words, counts.tolist())))
+        elif kind == "dict":
+            value = SharedResult({"root": description}, self._segment, self._shared_values)
+        else:
+            value = description["value"]
+
+        self._shared_values[cache_key] = value
+        return value
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __repr__(self):
+        return f"SharedResult({self.to_dict()!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Copies the result out of shared memory into plain dictionaries, lists and Counters
+        @return: Result dictionary
+        """
+        copies = {}
+
+        def copy(value):
+            if id(value) not in copies:
+                if isinstance(value, SharedResult):
+                    copies[id(value)] = {key: copy(item) for key, item in value.items()}
+                elif isinstance(value, SharedSentences):
+                    copies[id(value)] = list(value)
+                else:
+                    copies[id(value)] = value
+            return copies[id(value)]
+
+        return copy(self)
+
+    def __reduce__(self):
+        return dict, (self.to_dict(),)
+
+
+def init_worker(pipeline):
+    """
+    Stores the pipeline of a worker process so that it is pickled once per worker instead of once per file
+    @param pipeline: Pipeline to execute
+    @return: None
+    """
+    global _worker_pipeline
+    _worker_pipeline = pipeline
+
+
+def execute_shared(file_name: str, file_path: str, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Executes the worker's pipeline on a file and shares the result
+    @param file_name: Name of file
+    @param file_path: Path of file
+    @param kwargs: Keyword arguments for the pipeline steps
+    @return: Handle returned by share_result
+    """
+    return share_result(_worker_pipeline.execute(file_name, file_path, kwargs=kwargs))
@@ -0,0 +1,151 @@
+"""
+Class to find and read the files of a corpus
+source.py: Implementation of FileSource and compressed file helpers
+"""
+__author__ = "Srihari Raman"
+
+# Imports
+import bz2
+import glob
+import gzip
+import io
+import lzma
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Tuple
+
+from src.exceptions.load_exceptions import UnsupportedFileTypeError
+
+
+def _zstd_open(path, mode):
+    """
+    Opens a zstd-compressed file, which needs the optional zstandard package
+    """
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(f"Reading {path} requires the zstandard package (pip install zstandard)")
+    return zstandard.open(path, mode)
+
+
+# Compression suffix -> function opening a file of that kind
+COMPRESSION_OPENERS = {
+    '.gz': gzip.open,
+    '.bz2': bz2.open,
+    '.xz': lzma.open,
+    '.zst': _zstd_open,
+}
+
+
+def split_compression(path: str) -> Tuple[str, str]:
+    """
+    Splits the compression suffix off a path
+    @param path: Path of the file
+    @return: Tuple of (path without the compression suffix, compression suffix or '')
+    """
+    base, suffix = os.path.splitext(path)
+    if suffix.lower() in COMPRESSION_OPENERS:
+        return base, suffix.lower()
+    return path, ''
+
+
+def file_type_of(path: str) -> str:
+    """
+    Infers the Load file type of a path from its extension, ignoring any compression suffix
+    @param path: Path of the file
+    @return: File type such as 'txt' or 'csv'
+    """
+    base, _ = split_compression(path)
+    return os.path.splitext(base)[1].lower().lstrip('.')
+
+
+def open_text(path: str, encoding: str = 'utf-8') -> io.TextIOBase:
+    """
+    Opens a file for reading text, decompressing it on the fly if it is gzip, bz2, xz or zstd compressed
+    @param path: Path of the file
+    @param encoding: Text encoding of the (decompressed) file (default: utf-8)
+    @return: Readable text file object
+    """
+    _, compression = split_compression(path)
+    if not compression:
+        return open(path, 'r', encoding=encoding)
+    return io.TextIOWrapper(COMPRESSION_OPENERS[compression](path, 'rb'), encoding=encoding)
+
+
+def read_text(path: str, encoding: str = 'utf-8') -> str:
+    """
+    Reads the whole (decompressed) text of a file
+    @param path: Path of the file
+    @param encoding: Text encoding of the (decompressed) file (default: utf-8)
+    @return: Text of the file
+    """
+    with open_text(path, encoding) as file:
+        return file.read()
+
+
+class FileSource:
+    """
+    Class implementation of a corpus source built from a directory or glob <br><br>
+    Can be passed to NLPAnalyzer in place of a list of (file_name, file_path) tuples. Files may be compressed; file
+    contents are read ahead by a thread pool while the pipeline works on earlier files. <br><br>
+    """
+
+    def __init__(self, pattern: str, file_types=('txt', 'csv', 'jsonl'), max_workers: int = 4, prefetch: int = 8,
+                 encoding: str = 'utf-8'):
+        """
+        Constructor to take in a directory or glob pattern <br><br>
+        @param pattern: Directory (searched recursively) or glob pattern such as 'data/**/*.txt.gz'
+        @param file_types: File types to include, compressed or not (default: txt, csv and jsonl)
+        @param max_workers: Number of reader threads (default: 4)
+        @param prefetch: Maximum number of files read ahead of the pipeline (default: 8)
+        @param encoding: Text encoding of the files (default: utf-8)
+        """
+        for file_type in file_types:
+            if file_type not in ('txt', 'csv', 'jsonl'):
+                raise UnsupportedFileTypeError(file_type)
+
+        if os.path.isdir(pattern):
+            root = pattern
+            paths = glob.glob(os.path.join(pattern, '**', '*'), recursive=True)
+        else:
+            root = os.path.dirname(pattern.split('*')[0].split('?')[0].split('[')[0])
+            paths = glob.glob(pattern, recursive=True)
+
+        self.pattern = pattern
+        self.max_workers = max_workers
+        self.prefetch_size = max(1, prefetch)
+        self.encoding = encoding
+        # File names are relative to the searched directory so that files in different folders stay distinct
+        self.files = [(os.path.relpath(path, root) if root else path, path)
+                      for path in sorted(paths)
+                      if os.path.isfile(path) and file_type_of(path) in file_types]
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        return iter(self.files)
+
+    def __len__(self):
+        return len(self.files)
+
+    def prefetch(self, exclude=()) -> Iterator[Tuple[str, str, str]]:
+        """
+        Iterates over the files while a thread pool reads and decompresses the following ones <br><br>
+        @param exclude: Names of files to skip without reading them (default: none)
+        @return: Iterator of (file_name, file_path, file_content)
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = deque()
+            files = ((file_name, file_path) for file_name, file_path in self.files if file_name not in exclude)
+
+            for file_name, file_path in files:
+                pending.append((file_name, file_path, executor.submit(read_text, file_path, self.encoding)))
+                if len(pending) >= self.prefetch_size:
+                    break
+
+            while pending:
+                file_name, file_path, future = pending.popleft()
+                # Keep the window full before handing the next file to the pipeline
+                for next_name, next_path in files:
+                    pending.append((next_name, next_path, executor.submit(read_text, next_path, self.encoding)))
+                    break
+                yield file_name, file_path, future.result()
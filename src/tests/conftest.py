@@ -0,0 +1,48 @@
+"""
+Shared test helpers
+conftest.py: Stub steps and parsers shared by the unit tests
+"""
+__author__ = "Srihari Raman"
+
+from collections import Counter
+import pytest
+
+from src.process import Process
+
+
+class LocalProcess(Process):
+    """
+    Process step that skips downloading the stop words, which most process types never use
+    """
+    def load_stopwords(self, *args, **kwargs):
+        return []
+
+
+@pytest.fixture
+def local_process():
+    return LocalProcess
+
+
+class StubParser:
+    """
+    Stands in for a Pipeline, producing the keys of the word_count and word_frequency Analyze steps <br><br>
+    Each file path is looked up in texts; other paths get two sentences made from the path, and the path 'fail'
+    raises a ValueError. <br><br>
+    """
+    def __init__(self, texts=None):
+        self.texts = texts or {}
+        self.executed = []
+
+    def execute(self, file_name, file_path, **kwargs):
+        if file_path == "fail":
+            raise ValueError("cannot analyze")
+        self.executed.append(file_name)
+        sentences = list(self.texts.get(file_path, [f"{file_path} word", "shared word"]))
+        words = [word for sentence in sentences for word in sentence.split()]
+        return {file_name: {"raw_text": sentences, "processed_text": sentences}, "processed_text": sentences,
+                "word_count": len(words), "word_frequency": Counter(words)}
+
+
+@pytest.fixture
+def stub_parser():
+    return StubParser
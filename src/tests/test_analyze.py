@@ -0,0 +1,131 @@
+"""
+Unit tests for the Analyze class
+test_analyze.py: Tests the analyze.py and memo.py modules
+"""
+__author__ = "Reema Sharma"
+
+import pytest
+
+from src.aggregate import combine_estimates
+from src.analyze import Analyze, _sample_positions
+from src.memo import SentimentMemo
+
+########################################   FIXTURES   ########################################
+@pytest.fixture
+def expanded_text():
+    return ["What a great day.", "What a great day.", "The food was awful.", "What a great day."]
+
+
+@pytest.fixture
+def deduplicated_text():
+    return ["What a great day.", "The food was awful."], [3, 1]
+
+
+def run_all(result_dict, memo=None):
+    for analyze_type in ("word_count", "polarity_score", "subjectivity_score", "word_frequency"):
+        Analyze(analyze_type, memo=memo).run(result_dict, "test_file")
+    return result_dict
+
+########################################   MULTIPLICITY TESTS   ########################################
+def test_multiplicity_matches_expanded_text(expanded_text, deduplicated_text):
+    """
+    Test that weighting unique sentences by multiplicity gives the same results as the full text
+    """
+    sentences, multiplicity = deduplicated_text
+    expected = run_all({"processed_text": expanded_text})
+    result = run_all({"processed_text": sentences, "sentence_multiplicity": multiplicity})
+
+    assert result["word_count"] == expected["word_count"]
+    assert result["word_frequency"] == expected["word_frequency"]
+    assert result["avg_polarity"] == pytest.approx(expected["avg_polarity"])
+    assert result["avg_subjectivity"] == pytest.approx(expected["avg_subjectivity"])
+
+########################################   MEMO TESTS   ########################################
+def test_memo_scores_each_sentence_once(expanded_text):
+    memo = SentimentMemo()
+    run_all({"processed_text": expanded_text}, memo=memo)
+
+    assert memo.misses == 2
+    assert memo.hits == 2 * len(expanded_text) - 2
+
+
+def test_memo_persists_across_runs(expanded_text, tmp_path):
+    path = str(tmp_path / "sentiment.db")
+    first = SentimentMemo(path)
+    expected = run_all({"processed_text": expanded_text}, memo=first)
+    first.close()
+
+    second = SentimentMemo(path)
+    result = run_all({"processed_text": expanded_text}, memo=second)
+
+    assert second.misses == 0
+    assert result["avg_polarity"] == expected["avg_polarity"]
+
+########################################   APPROXIMATE TESTS   ########################################
+@pytest.fixture
+def long_text():
+    return [" ".join(["word"] * (1 + i % 7)) + " great." for i in range(2000)]
+
+
+def test_full_sample_is_exact(expanded_text):
+    exact = Analyze("polarity_score").run({"processed_text": expanded_text}, "test_file")
+    result = Analyze("polarity_score", sample_size=len(expanded_text)).run({"processed_text": expanded_text},
+                                                                           "test_file")
+
+    assert result["avg_polarity"] == pytest.approx(exact["avg_polarity"])
+    assert result["avg_polarity_se"] == 0.0
+    assert result["avg_polarity_sample_size"] == len(expanded_text)
+
+
+def test_sampled_word_count(long_text):
+    exact = Analyze("word_count").run({"processed_text": long_text}, "test_file")["word_count"]
+    result = Analyze("word_count", sample_size=200).run({"processed_text": long_text}, "test_file")
+
+    low, high = result["word_count_ci"]
+    assert result["word_count_sample_size"] == 200
+    assert low <= exact <= high
+
+
+def test_target_error_stops_early(long_text):
+    result = Analyze("word_count", target_error=0.05 * len(long_text)).run({"processed_text": long_text},
+                                                                           "test_file")
+
+    assert 30 <= result["word_count_sample_size"] < len(long_text)
+    assert result["word_count_ci"][1] - result["word_count_ci"][0] <= 0.1 * len(long_text)
+
+
+def test_sample_positions_are_drawn_lazily():
+    # Drawing a few positions must not touch the rest of a population far too large to shuffle
+    positions = list(_sample_positions(10 ** 15, 50, seed=0))
+
+    assert len(set(positions)) == 50
+    assert all(0 <= position < 10 ** 15 for position in positions)
+    assert sorted(_sample_positions(10, 10, seed=0)) == list(range(10))
+
+
+def test_sampling_counts_multiplicity(deduplicated_text):
+    sentences, multiplicity = deduplicated_text
+    result = Analyze("word_count", sample_size=4).run({"processed_text": sentences,
+                                                       "sentence_multiplicity": multiplicity}, "test_file")
+
+    assert result["word_count"] == pytest.approx(16)
+    assert result["word_count_se"] == 0.0
+
+
+def test_empty_text_estimates():
+    for analyze_type, key in (("word_count", "word_count"), ("polarity_score", "avg_polarity")):
+        result = Analyze(analyze_type, sample_size=10).run({"processed_text": []}, "test_file")
+
+        assert result[key] == 0.0
+        assert result[f"{key}_ci"] == (0.0, 0.0)
+        assert result[f"{key}_se"] == 0.0
+
+
+def test_combine_estimates():
+    results = {"a": {"processed_text": ["x"] * 3, "avg_polarity": 0.5, "avg_polarity_se": 0.1},
+               "b": {"processed_text": ["x"], "avg_polarity": -0.5}}
+    combined = combine_estimates(results, "avg_polarity")
+
+    assert combined["estimate"] == pytest.approx(0.25)
+    assert combined["se"] == pytest.approx(0.075)
+    assert combined["ci"][0] < 0.25 < combined["ci"][1]
@@ -0,0 +1,63 @@
+"""
+Unit tests for the Checkpoint class
+test_checkpoint.py: Tests the checkpoint.py module
+"""
+__author__ = "Srihari Raman"
+
+from collections import Counter
+import pytest
+
+from src.checkpoint import Checkpoint
+
+########################################   FIXTURES   ########################################
+@pytest.fixture
+def log_path(tmp_path):
+    return str(tmp_path / "run.ckpt")
+
+
+def make_result(file_name, words):
+    return {file_name: {"raw_text": [words]}, "word_frequency": Counter(words.split())}
+
+########################################   CHECKPOINT TESTS   ########################################
+def test_round_trip(log_path):
+    checkpoint = Checkpoint(log_path)
+    checkpoint.add("a", make_result("a", "one two two"))
+    checkpoint.add("b", make_result("b", "three"))
+
+    results = Checkpoint(log_path).load()
+
+    assert list(results) == ["a", "b"]
+    assert results["a"]["word_frequency"] == Counter({"two": 2, "one": 1})
+
+
+def test_interval_buffers_writes(log_path):
+    checkpoint = Checkpoint(log_path, interval=2)
+    checkpoint.add("a", make_result("a", "one"))
+    assert Checkpoint(log_path).load() == {}
+
+    checkpoint.add("b", make_result("b", "two"))
+    assert list(Checkpoint(log_path).load()) == ["a", "b"]
+
+
+def test_torn_record_is_discarded(log_path):
+    checkpoint = Checkpoint(log_path)
+    checkpoint.add("a", make_result("a", "one"))
+    checkpoint.add("b", make_result("b", "two"))
+
+    # Simulate a crash in the middle of writing the second record
+    with open(log_path, 'r+b') as file:
+        file.truncate(file.seek(0, 2) - 3)
+
+    assert list(Checkpoint(log_path).load()) == ["a"]
+
+    # New records are appended right after the last complete one
+    checkpoint.add("c", make_result("c", "three"))
+    assert list(Checkpoint(log_path).load()) == ["a", "c"]
+
+
+def test_clear(log_path):
+    checkpoint = Checkpoint(log_path)
+    checkpoint.add("a", make_result("a", "one"))
+    checkpoint.clear()
+
+    assert Checkpoint(log_path).load() == {}
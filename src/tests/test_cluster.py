@@ -0,0 +1,59 @@
+"""
+Unit tests for sharded execution
+test_cluster.py: Tests the cluster.py module
+"""
+__author__ = "Srihari Raman"
+
+import socket
+import pytest
+
+from src.cluster import Coordinator, LocalWorkers, shard_of
+from src.exceptions.cluster_exceptions import ShardFailedError
+from src.framework import NLPAnalyzer
+
+########################################   FIXTURES   ########################################
+FILES = [(f"file_{i}", f"text{i % 5}") for i in range(20)]
+
+
+@pytest.fixture(scope="module")
+def workers():
+    with LocalWorkers(2) as local_workers:
+        yield local_workers
+
+
+def free_address():
+    # A port that was free a moment ago, so nothing is listening on it
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()
+
+########################################   COORDINATOR TESTS   ########################################
+def test_matches_single_node_run(workers, stub_parser):
+    single = NLPAnalyzer(FILES, stub_parser())
+    single.analyze()
+    sharded = NLPAnalyzer(FILES, stub_parser())
+    coordinator = Coordinator(stub_parser(), workers.addresses)
+    sharded.analyze(coordinator=coordinator)
+
+    assert list(sharded.results) == list(single.results)
+    assert sharded.results == single.results
+    assert coordinator.corpus.to_dict() == single.corpus.to_dict()
+
+
+def test_shards_are_stable():
+    assert [shard_of(name, 3) for name, _ in FILES] == [shard_of(name, 3) for name, _ in FILES]
+    assert len({shard_of(name, 3) for name, _ in FILES}) == 3
+
+
+def test_failed_worker_is_retried(workers, stub_parser):
+    coordinator = Coordinator(stub_parser(), [free_address()] + workers.addresses, retries=1)
+    results = dict(coordinator.run((name, path, {}) for name, path in FILES))
+
+    assert list(results) == [name for name, _ in FILES]
+    assert coordinator.corpus.to_dict()["word_count"] == 4 * len(FILES)
+
+
+def test_failing_shard_raises(workers, stub_parser):
+    coordinator = Coordinator(stub_parser(), workers.addresses, retries=1)
+    with pytest.raises(ShardFailedError):
+        list(coordinator.run([("bad", "fail", {})]))
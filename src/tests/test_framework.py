@@ -0,0 +1,117 @@
+"""
+Unit tests for the NLPAnalyzer class
+test_framework.py: Tests the framework.py module
+"""
+__author__ = "Srihari Raman"
+
+from collections import Counter
+import pytest
+
+from src.checkpoint import Checkpoint
+from src.framework import NLPAnalyzer
+from src.metrics import FILES, SENTENCES
+
+########################################   FIXTURES   ########################################
+TEXTS = {"a": ["good day", "bad day"], "b": ["good food"], "c": ["bad food", "good good day"]}
+
+
+@pytest.fixture
+def analyzer(stub_parser):
+    nlp = NLPAnalyzer([("a", "a"), ("b", "b")], stub_parser(TEXTS))
+    nlp.analyze()
+    return nlp
+
+
+def rebuilt(stub_parser, files):
+    nlp = NLPAnalyzer(files, stub_parser(TEXTS))
+    nlp.analyze()
+    return nlp
+
+########################################   INCREMENTAL TESTS   ########################################
+def test_add_files_matches_full_run(analyzer, stub_parser):
+    analyzer.parser.executed.clear()
+    analyzer.add_files([("c", "c")])
+    expected = rebuilt(stub_parser, [("a", "a"), ("b", "b"), ("c", "c")])
+
+    assert analyzer.parser.executed == ["c"]
+    assert analyzer.corpus.to_dict() == expected.corpus.to_dict()
+    assert analyzer.vocabulary == expected.vocabulary
+    assert analyzer.vocabulary["day"] == 2
+    assert analyzer.files == [("a", "a"), ("b", "b"), ("c", "c")]
+
+
+def test_remove_files_matches_full_run(analyzer, stub_parser):
+    analyzer.build_index()
+    analyzer.parser.executed.clear()
+    analyzer.remove_files(["a"])
+    expected = rebuilt(stub_parser, [("b", "b")])
+
+    assert analyzer.parser.executed == []
+    assert analyzer.corpus.to_dict() == expected.corpus.to_dict()
+    assert analyzer.vocabulary == Counter({"good": 1, "food": 1})
+    assert analyzer.index.lookup("day", level="file") == []
+
+
+def test_add_existing_file_replaces_it(analyzer):
+    analyzer.add_files([("a", "c")])
+
+    assert analyzer.corpus.to_dict()["word_count"] == 2 + 5
+    assert analyzer.vocabulary["good"] == 2
+
+
+def test_remove_unknown_file(analyzer):
+    with pytest.raises(KeyError):
+        analyzer.remove_files(["missing"])
+
+
+def test_removed_files_stay_removed_on_resume(stub_parser, tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "run.ckpt"))
+    nlp = NLPAnalyzer([("a", "a"), ("b", "b")], stub_parser(TEXTS), checkpoint=checkpoint)
+    nlp.analyze()
+    nlp.remove_files(["b"])
+
+    assert list(Checkpoint(checkpoint.path).load()) == ["a"]
+
+
+def test_analyze_twice_does_not_double_count(analyzer):
+    expected = analyzer.corpus.to_dict()
+    vocabulary = Counter(analyzer.vocabulary)
+    analyzer.analyze()
+
+    assert analyzer.corpus.to_dict() == expected
+    assert analyzer.vocabulary == vocabulary
+
+
+def test_results_without_terms_skip_vocabulary():
+    class CountOnlyParser:
+        def execute(self, file_name, file_path, **kwargs):
+            return {"sentence_count": 2, "word_count": 4}
+
+    nlp = NLPAnalyzer([("a", "a")], CountOnlyParser())
+    nlp.analyze()
+
+    assert nlp.corpus.to_dict()["word_count"] == 4
+    assert nlp.vocabulary == Counter()
+
+
+def test_load_only_results():
+    class LoadOnlyParser:
+        def execute(self, file_name, file_path, **kwargs):
+            sentences = ["good day", "bad day"]
+            return {file_name: {"raw_text": sentences, "processed_text": sentences}}
+
+    nlp = NLPAnalyzer([("a", "a"), ("b", "b")], LoadOnlyParser())
+    nlp.analyze()
+    nlp.remove_files(["b"])
+
+    assert nlp.corpus.to_dict() == {"sentence_count": 2}
+    assert nlp.vocabulary == Counter({"day": 1, "good": 1, "bad": 1})
+
+########################################   METRICS TESTS   ########################################
+def test_completed_files_are_counted(stub_parser):
+    # The stub is not a Pipeline, like the workers and coordinators whose steps run in other processes
+    files, sentences = FILES.value(), SENTENCES.value(stage='corpus')
+    NLPAnalyzer([("a", "a"), ("c", "c")], stub_parser(TEXTS)).analyze()
+
+    assert FILES.value() - files == 2
+    assert SENTENCES.value(stage='corpus') - sentences == 4
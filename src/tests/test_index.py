@@ -0,0 +1,88 @@
+"""
+Unit tests for the InvertedIndex class
+test_index.py: Tests the index.py module
+"""
+__author__ = "Srihari Raman"
+
+import pytest
+
+from src.exceptions.index_exceptions import IndexFormatError
+from src.index import Index, InvertedIndex
+
+########################################   FIXTURES   ########################################
+@pytest.fixture(scope="module")
+def corpus():
+    return [
+        ("file_a", ["the cat sat", "the dog ran", "cat and cat"]),
+        ("file_b", ["a dog barked", "the bird sang"]),
+        ("file_c", []),
+        ("file_d", ["cat dog"]),
+    ]
+
+
+@pytest.fixture(scope="module")
+def index(corpus):
+    return InvertedIndex.build(corpus)
+
+########################################   QUERY TESTS   ########################################
+def test_lookup_sentences(index):
+    assert index.lookup("cat") == [("file_a", 0), ("file_a", 2), ("file_d", 0)]
+    assert index.lookup("missing") == []
+
+
+def test_lookup_files(index):
+    assert index.lookup("dog", level="file") == ["file_a", "file_b", "file_d"]
+
+
+def test_and_query(index):
+    assert index.and_query(["cat", "dog"]) == [("file_d", 0)]
+    assert index.and_query(["cat", "dog"], level="file") == ["file_a", "file_d"]
+    assert index.and_query(["cat", "missing"]) == []
+
+
+def test_or_query(index):
+    assert index.or_query(["bird", "sat"]) == [("file_a", 0), ("file_b", 1)]
+    assert index.or_query(["bird", "sat"], level="file") == ["file_a", "file_b"]
+
+
+def test_frequency(index):
+    assert index.frequency("cat", "file_a") == 3
+    assert index.frequency("cat", "file_b") == 0
+    assert index.frequency("cat") == {"file_a": 3, "file_d": 1}
+
+
+def test_frequency_counts_multiplicity():
+    results = {"file_a": {"processed_text": ["cat sat", "dog"], "sentence_multiplicity": [3, 1]},
+               "file_b": {"processed_text": ["cat cat"]}}
+    index = InvertedIndex.from_results(results)
+
+    assert index.frequency("cat") == {"file_a": 3, "file_b": 2}
+    assert index.lookup("cat") == [("file_a", 0), ("file_b", 0)]
+
+
+def test_unsupported_level(index):
+    with pytest.raises(ValueError):
+        index.lookup("cat", level="paragraph")
+
+########################################   STORAGE TESTS   ########################################
+def test_save_and_mmap_load(index, tmp_path):
+    index.save(str(tmp_path))
+    loaded = InvertedIndex.load(str(tmp_path))
+
+    assert loaded.lookup("dog") == index.lookup("dog")
+    assert loaded.frequency("the") == index.frequency("the")
+    assert loaded.and_query(["the", "cat"]) == [("file_a", 0)]
+
+
+def test_load_missing_index(tmp_path):
+    with pytest.raises(IndexFormatError):
+        InvertedIndex.load(str(tmp_path))
+
+########################################   STEP TESTS   ########################################
+def test_index_step(corpus):
+    step = Index()
+    for file_name, sentences in corpus:
+        result_dict = {file_name: {"raw_text": sentences, "processed_text": sentences}}
+        assert step.run(result_dict=result_dict, file_name=file_name, kwargs={}) is result_dict
+
+    assert step.index.lookup("bird") == [("file_b", 1)]
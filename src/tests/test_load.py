@@ -5,6 +5,7 @@ test_load.py: Tests the load.py module
 __author__ = "Srihari Raman"
 
 import pytest
+from nltk.tokenize.punkt import PunktSentenceTokenizer
 
 from src.exceptions.load_exceptions import ArgError
 from src.load import Load
@@ -109,4 +110,73 @@ def test_process_csv_file_not_accessible():
         processor._process_csv(result_dict, file_name, csv_target_text_col=csv_target_text_col)
 
 #################################   TXT TESTS   #################################
-#TODO: Add tests for _process_txt
\ No newline at end of file
+#TODO: Add tests for _process_txt
+
+#################################   JSONL TESTS   #################################
+@pytest.fixture
+def sample_jsonl_file(tmp_path):
+    filepath = tmp_path / "sample.jsonl"
+    filepath.write_text('{"id": 1, "text": "This is a sentence. This is another sentence."}\n'
+                        '\n'
+                        '{"id": 2, "text": null}\n'
+                        '{"id": 3, "text": "This is a third sentence."}\n')
+    return str(filepath)
+
+def test_process_jsonl_success(sample_jsonl_file):
+    processor = Load(file_type="jsonl")
+    file_name = "sample_jsonl"
+
+    result = processor._process_jsonl({}, file_name, kwargs={"filepath": sample_jsonl_file,
+                                                             "jsonl_target_text_key": "text"})
+
+    expected_sentences = ['This is a sentence.', 'This is another sentence.', 'This is a third sentence.']
+    assert result[file_name]['raw_text'] == expected_sentences
+    assert result[file_name]['processed_text'] == expected_sentences
+
+def test_process_jsonl_missing_key(sample_jsonl_file):
+    processor = Load(file_type="jsonl")
+
+    with pytest.raises(ArgError):
+        processor._process_jsonl({}, "sample_jsonl", kwargs={"filepath": sample_jsonl_file})
+
+
+#################################   PARQUET TESTS   #################################
+@pytest.fixture
+def sample_parquet_file(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    filepath = str(tmp_path / "sample.parquet")
+    table = pa.table({"id": [1, 2, 3],
+                      "text": ["This is a sentence. This is another sentence.", None, "This is a third sentence."]})
+    pq.write_table(table, filepath, row_group_size=1)
+    return filepath
+
+def test_process_parquet_success(sample_parquet_file):
+    processor = Load(file_type="parquet")
+    file_name = "sample_parquet"
+
+    result = processor._process_parquet({}, file_name, kwargs={"filepath": sample_parquet_file,
+                                                               "parquet_target_text_col": "text"})
+
+    expected_sentences = ['This is a sentence.', 'This is another sentence.', 'This is a third sentence.']
+    assert result[file_name]['raw_text'] == expected_sentences
+    assert result[file_name]['processed_text'] == expected_sentences
+
+def test_process_parquet_missing_column(sample_parquet_file):
+    processor = Load(file_type="parquet")
+
+    with pytest.raises(ArgError):
+        processor._process_parquet({}, "sample_parquet", kwargs={"filepath": sample_parquet_file})
+
+########################################   BATCH TESTS   ########################################
+def test_txt_batches_match_whole_file(monkeypatch):
+    # NLTK's Punkt algorithm with default parameters, so the test needs no downloaded models
+    tokenizer = PunktSentenceTokenizer()
+    monkeypatch.setattr("src.load.sent_tokenize", tokenizer.tokenize)
+    content = ("\n\nIntroduction\n\nThe first paragraph. It has two sentences.\n\n\n"
+               "A sentence that goes on\nacross lines\n\nand a blank line. The end!\n")
+
+    batches = list(Load("txt").iter_batches("test_file", 2, kwargs={"file_content": content, "filepath": "a.txt"}))
+
+    assert [sentence for batch in batches for sentence in batch] == tokenizer.tokenize(content)
+    assert all(len(batch) == 2 for batch in batches[:-1])
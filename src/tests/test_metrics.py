@@ -0,0 +1,82 @@
+"""
+Unit tests for runtime metrics
+test_metrics.py: Tests the metrics.py module
+"""
+__author__ = "Srihari Raman"
+
+import io
+import json
+import urllib.request
+import pytest
+
+from src.metrics import JSONLinesWriter, MetricsRegistry, MetricsServer, ProgressReporter
+
+########################################   FIXTURES   ########################################
+@pytest.fixture
+def registry():
+    registry = MetricsRegistry()
+    registry.counter("files_total", "Files").inc(3)
+    registry.counter("sentences_total", "Sentences").inc(5, stage="load")
+    latency = registry.histogram("step_seconds", "Latency", buckets=(0.1, 1.0))
+    latency.observe(0.05, step="stem")
+    latency.observe(0.5, step="stem")
+    latency.observe(5.0, step="stem")
+    return registry
+
+########################################   REGISTRY TESTS   ########################################
+def test_render_prometheus_text(registry):
+    text = registry.render()
+
+    assert "# TYPE files_total counter\nfiles_total 3\n" in text
+    assert 'sentences_total{stage="load"} 5' in text
+    assert 'step_seconds_bucket{step="stem",le="0.1"} 1' in text
+    assert 'step_seconds_bucket{step="stem",le="1.0"} 2' in text
+    assert 'step_seconds_bucket{step="stem",le="+Inf"} 3' in text
+    assert 'step_seconds_count{step="stem"} 3' in text
+
+
+def test_metrics_are_registered_once(registry):
+    assert registry.counter("files_total", "Files").value() == 3
+    with pytest.raises(ValueError):
+        registry.gauge("files_total", "Files")
+
+
+def test_snapshot_is_json(registry):
+    snapshot = json.loads(json.dumps(registry.snapshot()))
+
+    assert snapshot["files_total"] == [{"labels": {}, "value": 3}]
+    assert snapshot["step_seconds"][0]["value"]["count"] == 3
+
+########################################   EXPORTER TESTS   ########################################
+def test_metrics_server(registry):
+    server = MetricsServer(registry, port=0)
+    try:
+        with urllib.request.urlopen("http://%s:%d/metrics" % server.server_address) as response:
+            assert "files_total 3" in response.read().decode("utf-8")
+    finally:
+        server.shutdown()
+
+
+def test_json_lines_writer(registry, tmp_path):
+    path = str(tmp_path / "metrics.jsonl")
+    JSONLinesWriter(path, interval=60, registry=registry).close()
+
+    with open(path) as file:
+        lines = file.readlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0])["metrics"]["files_total"][0]["value"] == 3
+
+########################################   PROGRESS TESTS   ########################################
+def test_progress_eta():
+    stream = io.StringIO()
+    progress = ProgressReporter(total=4, interval=3600, stream=stream)
+    progress.start()
+    progress.started -= 10
+    progress.update("a", {"processed_text": ["one", "two"]})
+
+    assert progress.sentences == 2
+    assert progress.eta == pytest.approx(30, rel=0.01)
+    assert stream.getvalue() == ""
+
+    progress.finish()
+    assert stream.getvalue().startswith("1/4 files (25.0%)")
@@ -0,0 +1,48 @@
+"""
+Unit tests for vectorized normalization
+test_normalize.py: Tests the normalize.py module
+"""
+__author__ = "Sriya Vuppala"
+
+import random
+import re
+import pandas as pd
+import pytest
+
+from src.normalize import collapse_whitespace, lowercase, normalize, normalize_series, strip_punctuation
+
+########################################   FIXTURES   ########################################
+@pytest.fixture
+def sentences():
+    rng = random.Random(0)
+    alphabet = "aZ9_ .,!?'\"-\t\néÉİßΣ’— ٣中\U0001F600\x1f"
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randrange(40))) for _ in range(500)] + ["", "A."]
+
+
+def per_sentence(sentences):
+    return [re.sub(r'[^\w\s]', '', sentence.lower()) for sentence in sentences]
+
+########################################   NORMALIZE TESTS   ########################################
+def test_matches_per_sentence_methods(sentences):
+    assert lowercase(sentences) == [sentence.lower() for sentence in sentences]
+    assert strip_punctuation(sentences) == [re.sub(r'[^\w\s]', '', sentence) for sentence in sentences]
+    assert normalize(sentences) == per_sentence(sentences)
+
+
+def test_separator_free_batch(sentences):
+    clean = [sentence.replace("\x1f", "") for sentence in sentences]
+    assert normalize(clean) == per_sentence(clean)
+
+
+def test_collapse_whitespace():
+    assert collapse_whitespace(["  Hello,\t world \n"]) == ["Hello, world"]
+    assert normalize(["  Hello,\t World! \n"], whitespace=True) == ["hello world"]
+
+
+def test_empty_batch():
+    assert normalize([]) == []
+
+
+def test_series_matches_list(sentences):
+    series = pd.Series(sentences)
+    assert normalize_series(series, whitespace=True).tolist() == normalize(sentences, whitespace=True)
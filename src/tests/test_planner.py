@@ -0,0 +1,88 @@
+"""
+Unit tests for the pipeline planner
+test_planner.py: Tests the planner.py module and Pipeline.optimize
+"""
+__author__ = "Sriya Vuppala"
+
+import pytest
+
+from src.analyze import Analyze
+from src.exceptions.pipeline_exceptions import InvalidPipelineError
+from src.load import Load
+from src.pipeline import Pipeline
+from src.process import Process
+
+
+class StubProcess(Process):
+    """
+    Process step that skips downloading the stop words and WordNet data, which planning never uses
+    """
+    def __init__(self, process_type):
+        self.process_type = process_type
+        self.map = dict.fromkeys(['stop_words', 'punctuation', 'lemmatize', 'stem', 'capitalization', 'dedup'])
+
+
+def names(pipeline):
+    return [name for name, _ in pipeline.steps]
+
+########################################   SIMPLIFICATION TESTS   ########################################
+def test_repeated_idempotent_step_dropped():
+    pipeline = Pipeline([("load", Load("str")), ("stop", StubProcess("stop_words")),
+                         ("count", Analyze("word_count")), ("stop_again", StubProcess("stop_words")),
+                         ("stem", StubProcess("stem")), ("stem_again", StubProcess("stem"))], optimize=True)
+
+    assert names(pipeline) == ["load", "stop", "count", "stem", "stem_again"]
+    assert len(pipeline.plan_notes) == 1
+
+
+def test_capitalization_after_stem_dropped():
+    pipeline = Pipeline([("load", Load("str")), ("stem", StubProcess("stem")),
+                         ("lower", StubProcess("capitalization"))], optimize=True)
+
+    assert names(pipeline) == ["load", "stem"]
+
+
+def test_overwritten_analyze_step_dropped():
+    pipeline = Pipeline([("load", Load("str")), ("count", Analyze("word_count")),
+                         ("punct", StubProcess("punctuation")), ("count_again", Analyze("word_count"))],
+                        optimize=True)
+
+    assert names(pipeline) == ["load", "punct", "count_again"]
+
+
+def test_approximate_step_kept_before_exact_step():
+    steps = [("load", Load("str")), ("sampled", Analyze("word_count", sample_size=10)),
+             ("exact", Analyze("word_count")), ("sampled_again", Analyze("polarity_score", sample_size=10)),
+             ("sampled_last", Analyze("polarity_score", target_error=0.1))]
+
+    assert names(Pipeline(steps, optimize=True)) == ["load", "sampled", "exact", "sampled_last"]
+
+
+def test_order_kept_without_reorder():
+    steps = [("load", Load("str")), ("lemma", StubProcess("lemmatize")), ("stop", StubProcess("stop_words")),
+             ("dedup", StubProcess("dedup"))]
+
+    assert names(Pipeline(list(steps), optimize=True)) == ["load", "lemma", "stop", "dedup"]
+
+########################################   REORDER TESTS   ########################################
+def test_dedup_moved_first():
+    pipeline = Pipeline([("load", Load("str")), ("lemma", StubProcess("lemmatize")),
+                         ("dedup", StubProcess("dedup")), ("count", Analyze("word_count"))], reorder=True)
+
+    assert names(pipeline) == ["load", "dedup", "lemma", "count"]
+    assert "dedup" in pipeline.explain()
+
+########################################   VALIDATION TESTS   ########################################
+def test_step_before_load_rejected():
+    with pytest.raises(InvalidPipelineError):
+        Pipeline([("stem", StubProcess("stem")), ("load", Load("str"))], optimize=True)
+
+
+def test_unknown_type_rejected():
+    with pytest.raises(InvalidPipelineError):
+        Pipeline([("load", Load("str")), ("bad", Analyze("sentiment"))], optimize=True)
+
+
+def test_malformed_step_rejected():
+    with pytest.raises(InvalidPipelineError):
+        Pipeline([Load("str")], optimize=True)
@@ -0,0 +1,28 @@
+"""
+Unit tests for the Process class
+test_process.py: Tests the process.py module
+"""
+__author__ = "Sriya Vuppala"
+
+from src.process import Process
+
+########################################   FIXTURES   ########################################
+def run(process, sentences):
+    result_dict = {"test_file": {"processed_text": list(sentences)}}
+    return process.run(result_dict, "test_file")["processed_text"]
+
+########################################   LEMMATIZE TESTS   ########################################
+def test_lemmatize_pos_uses_part_of_speech(local_process):
+    assert run(local_process("lemmatize_pos"), ["The dogs were running"]) == ["The dog be run"]
+
+
+def test_lemmatize_pos_caches_lemmas(local_process):
+    process = local_process("lemmatize_pos")
+
+    assert run(process, ["the cats sat", "the cats sat"]) == ["the cat sit", "the cat sit"]
+    assert process.lemma_misses == 3
+    assert process.lemma_hits == 3
+
+
+def test_lemmatize_pos_is_elementwise():
+    assert "lemmatize_pos" in Process.ELEMENTWISE_TYPES
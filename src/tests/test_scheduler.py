@@ -0,0 +1,106 @@
+"""
+Unit tests for the StageScheduler class
+test_scheduler.py: Tests the scheduler.py and aggregate.py modules
+"""
+__author__ = "Srihari Raman"
+
+import threading
+from collections import Counter
+import pytest
+
+from src.aggregate import ResultAggregate
+from src.analyze import Analyze
+from src.index import Index
+from src.load import Load
+from src.pipeline import Pipeline
+from src.scheduler import MemoryBudget, StageScheduler
+
+########################################   FIXTURES   ########################################
+ANALYZE_TYPES = ("word_count", "polarity_score", "subjectivity_score", "word_frequency")
+
+
+def analyze(sentences):
+    result_dict = {"processed_text": sentences}
+    for analyze_type in ANALYZE_TYPES:
+        Analyze(analyze_type).run(result_dict, "test_file")
+    return result_dict
+
+########################################   AGGREGATE TESTS   ########################################
+def test_merged_parts_match_whole():
+    sentences = ["What a great day.", "The food was awful.", "It rained.", "I love this place."]
+    whole = analyze(sentences)
+
+    merged = ResultAggregate().add(analyze(sentences[:1])).add(analyze(sentences[1:])).to_dict()
+
+    assert merged["sentence_count"] == 4
+    assert merged["word_count"] == whole["word_count"]
+    assert merged["word_frequency"] == whole["word_frequency"]
+    assert merged["avg_polarity"] == pytest.approx(whole["avg_polarity"])
+    assert merged["avg_subjectivity"] == pytest.approx(whole["avg_subjectivity"])
+
+
+def test_remove_undoes_add():
+    first, second = analyze(["What a great day."]), analyze(["The food was awful."])
+    aggregate = ResultAggregate().add(first).add(second).remove(second).to_dict()
+
+    assert aggregate["word_count"] == first["word_count"]
+    assert aggregate["word_frequency"] == first["word_frequency"]
+    assert aggregate["avg_polarity"] == pytest.approx(first["avg_polarity"])
+
+########################################   BUDGET TESTS   ########################################
+def test_budget_blocks_until_released():
+    budget = MemoryBudget(100)
+    assert budget.acquire(80)
+
+    acquired = threading.Event()
+    thread = threading.Thread(target=lambda: budget.acquire(40) and acquired.set())
+    thread.start()
+    assert not acquired.wait(0.2)
+
+    budget.release(80)
+    assert acquired.wait(1)
+    thread.join()
+    assert budget.peak == 80
+
+
+def test_oversized_batch_runs_alone():
+    budget = MemoryBudget(10)
+
+    assert budget.acquire(50)
+    budget.release(50)
+    assert budget.used == 0
+
+
+def test_stopped_acquire_gives_up():
+    budget = MemoryBudget(10)
+    budget.acquire(10)
+    stop = threading.Event()
+    stop.set()
+
+    assert not budget.acquire(5, stop)
+
+########################################   SCHEDULER TESTS   ########################################
+def test_scheduler_streams_files():
+    pipeline = Pipeline([("load", Load("str")), ("word_count", Analyze("word_count")),
+                         ("word_frequency", Analyze("word_frequency"))])
+    scheduler = StageScheduler(pipeline, memory_budget=1024, batch_size=2)
+    files = [("a", None, {"file_text": "One two. Three four. Five six. Seven."}),
+             ("b", None, {"file_text": "Eight nine ten."})]
+
+    results = dict(scheduler.run(files))
+
+    assert list(results) == ["a", "b"]
+    assert results["a"]["sentence_count"] == 4
+    assert results["a"]["word_count"] == 7
+    assert results["b"]["word_frequency"] == Counter({"Eight": 1, "nine": 1, "ten.": 1})
+    assert scheduler.budget.used == 0
+
+
+def test_scheduler_requires_load_step():
+    with pytest.raises(ValueError):
+        StageScheduler(Pipeline([("word_count", Analyze("word_count"))]))
+
+
+def test_scheduler_rejects_non_process_steps():
+    with pytest.raises(ValueError):
+        StageScheduler(Pipeline([("load", Load("str")), ("index", Index()), ("word_count", Analyze("word_count"))]))
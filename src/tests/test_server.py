@@ -0,0 +1,64 @@
+"""
+Unit tests for the AnalysisServer class
+test_server.py: Tests the server.py module and Pipeline.execute_batch
+"""
+__author__ = "Srihari Raman"
+
+import json
+import threading
+import urllib.request
+import pytest
+
+from src.analyze import Analyze
+from src.load import Load
+from src.pipeline import Pipeline
+from src.server import AnalysisServer
+
+########################################   FIXTURES   ########################################
+@pytest.fixture
+def pipeline(local_process):
+    # Both Process steps are elementwise, so execute_batch runs them once over the whole batch
+    return Pipeline([("load", Load("str")), ("lower", local_process("capitalization")),
+                     ("punctuation", local_process("punctuation")), ("word_count", Analyze("word_count")),
+                     ("word_frequency", Analyze("word_frequency"))])
+
+
+@pytest.fixture
+def server(pipeline):
+    server = AnalysisServer(pipeline, port=0, max_batch_size=4, max_wait=0.01)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join()
+
+########################################   BATCH TESTS   ########################################
+def test_execute_batch_matches_execute(pipeline):
+    documents = [("a", None, {"file_text": "Hello world. This is a test."}),
+                 ("b", None, {"file_text": "Another document."})]
+
+    expected = [pipeline.execute(file_name, None, kwargs=kwargs) for file_name, _, kwargs in documents]
+    results = pipeline.execute_batch(documents)
+
+    assert results == expected
+    assert results[0]["processed_text"] == ["hello world", "this is a test"]
+    assert results[1]["word_count"] == 2
+
+########################################   SERVER TESTS   ########################################
+def test_concurrent_requests(server):
+    host, port = server.server_address
+    word_counts = {}
+
+    def analyze(i):
+        request = urllib.request.Request(f"http://{host}:{port}/analyze",
+                                         data=json.dumps({"text": "word " * i + "end.", "name": str(i)}).encode())
+        with urllib.request.urlopen(request) as response:
+            word_counts[i] = json.loads(response.read())["word_count"]
+
+    threads = [threading.Thread(target=analyze, args=(i,)) for i in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert word_counts == {i: i + 1 for i in range(10)}
@@ -0,0 +1,99 @@
+"""
+Unit tests for the shared-memory result transfer
+test_shared.py: Tests the shared.py module
+"""
+__author__ = "Srihari Raman"
+
+import gc
+import os
+import pickle
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import pytest
+
+from src.framework import NLPAnalyzer
+from src.shared import SharedResult, share_result
+
+########################################   FIXTURES   ########################################
+@pytest.fixture
+def result_dict():
+    sentences = ["the cat sat.", "naïve café — ünïcode!", ""]
+    return {
+        "file_a": {"raw_text": sentences, "processed_text": sentences},
+        "processed_text": sentences,
+        "word_count": 6,
+        "avg_polarity": 0.25,
+        "word_frequency": Counter({"the": 2, "cat": 1, "café": 3}),
+    }
+
+class FailingParser:
+    """
+    Stands in for a Pipeline, failing on files whose path is 'fail'
+    """
+    def execute(self, file_name, file_path, **kwargs):
+        if file_path == "fail":
+            raise ValueError("cannot analyze")
+        return {"processed_text": [f"{file_name} text"]}
+
+########################################   SHARED RESULT TESTS   ########################################
+def test_round_trip(result_dict):
+    shared = SharedResult(share_result(result_dict))
+
+    assert shared["processed_text"] == result_dict["processed_text"]
+    assert shared["processed_text"][1] == "naïve café — ünïcode!"
+    assert shared["processed_text"][-1] == ""
+    assert shared["file_a"]["raw_text"] == result_dict["file_a"]["raw_text"]
+    assert shared["word_frequency"].most_common(1) == [("café", 3)]
+    assert shared["word_count"] == 6
+    assert shared.to_dict() == result_dict
+
+
+def test_aliased_lists_are_shared(result_dict):
+    shared = SharedResult(share_result(result_dict))
+
+    assert shared["file_a"]["raw_text"] is shared["processed_text"]
+
+
+def test_pickles_as_plain_dict(result_dict):
+    shared = SharedResult(share_result(result_dict))
+    copy = pickle.loads(pickle.dumps(shared))
+
+    assert type(copy) is dict
+    assert type(copy["processed_text"]) is list
+    assert copy == result_dict
+
+
+def test_segment_unlinked_after_release(result_dict):
+    handle = share_result(result_dict)
+    shared = SharedResult(handle)
+    sentences = shared["processed_text"]
+    del shared
+    gc.collect()
+
+    # Views taken from the result keep the segment alive
+    assert sentences[0] == "the cat sat."
+    del sentences
+    gc.collect()
+
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=handle["name"])
+
+
+def test_worker_process_transfer(result_dict):
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        handle = executor.submit(share_result, result_dict).result()
+
+    assert SharedResult(handle).to_dict() == result_dict
+
+
+@pytest.mark.skipif(not os.path.isdir("/dev/shm"), reason="needs /dev/shm to list segments")
+def test_failed_run_leaves_no_segments():
+    before = set(os.listdir("/dev/shm"))
+    nlp = NLPAnalyzer([(f"file_{i}", "fail" if i == 2 else "text") for i in range(7)], FailingParser())
+    with pytest.raises(ValueError):
+        nlp.analyze(workers=2)
+    nlp.results.clear()
+    gc.collect()
+
+    assert set(os.listdir("/dev/shm")) - before == set()
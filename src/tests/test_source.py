@@ -0,0 +1,70 @@
+"""
+Unit tests for the FileSource class
+test_source.py: Tests the source.py module
+"""
+__author__ = "Srihari Raman"
+
+import bz2
+import gzip
+import lzma
+import pytest
+
+from src.exceptions.load_exceptions import UnsupportedFileTypeError
+from src.source import FileSource, file_type_of, read_text
+
+########################################   FIXTURES   ########################################
+@pytest.fixture
+def corpus_dir(tmp_path):
+    (tmp_path / "nested").mkdir()
+    (tmp_path / "plain.txt").write_text("Plain text.")
+    (tmp_path / "table.csv").write_text("id,sentences\n1,A row.\n")
+    (tmp_path / "ignored.md").write_text("Not part of the corpus.")
+    with gzip.open(tmp_path / "nested" / "gzipped.txt.gz", 'wt') as file:
+        file.write("Gzipped text.")
+    with bz2.open(tmp_path / "nested" / "bzipped.txt.bz2", 'wt') as file:
+        file.write("Bzipped text.")
+    with lzma.open(tmp_path / "xzipped.csv.xz", 'wt') as file:
+        file.write("id,sentences\n1,An xz row.\n")
+    return tmp_path
+
+########################################   HELPER TESTS   ########################################
+def test_file_type_ignores_compression():
+    assert file_type_of("data/notes.txt.gz") == "txt"
+    assert file_type_of("data/table.CSV.bz2") == "csv"
+    assert file_type_of("data/notes.txt") == "txt"
+
+
+def test_read_compressed_text(corpus_dir):
+    assert read_text(str(corpus_dir / "nested" / "gzipped.txt.gz")) == "Gzipped text."
+    assert read_text(str(corpus_dir / "nested" / "bzipped.txt.bz2")) == "Bzipped text."
+
+########################################   SOURCE TESTS   ########################################
+def test_directory_source(corpus_dir):
+    source = FileSource(str(corpus_dir))
+
+    assert [file_name for file_name, _ in source] == [
+        "nested/bzipped.txt.bz2", "nested/gzipped.txt.gz", "plain.txt", "table.csv", "xzipped.csv.xz"
+    ]
+    assert len(source) == 5
+
+
+def test_glob_source(corpus_dir):
+    source = FileSource(str(corpus_dir / "**" / "*.txt*"), file_types=("txt",))
+
+    assert [file_name for file_name, _ in source] == [
+        "nested/bzipped.txt.bz2", "nested/gzipped.txt.gz", "plain.txt"
+    ]
+
+
+def test_prefetch_preserves_order(corpus_dir):
+    source = FileSource(str(corpus_dir), max_workers=2, prefetch=2)
+    contents = {file_name: content for file_name, _, content in source.prefetch()}
+
+    assert list(contents) == [file_name for file_name, _ in source]
+    assert contents["nested/gzipped.txt.gz"] == "Gzipped text."
+    assert contents["xzipped.csv.xz"] == "id,sentences\n1,An xz row.\n"
+
+
+def test_unsupported_file_type(corpus_dir):
+    with pytest.raises(UnsupportedFileTypeError):
+        FileSource(str(corpus_dir), file_types=("md",))